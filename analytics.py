@@ -0,0 +1,253 @@
+"""
+메뉴(요리)별 리뷰 통계
+
+리뷰는 날짜 단위로만 저장되므로, 그날 제공된 요리에 리뷰를 나눠 붙여 요리별 통계를 미리 계산해 둡니다.
+- menu_dishes : 메뉴를 요리 단위로 나눈 표 (날짜, 식당, 구분, 요리 ID)
+- dish_daily  : 날짜/식당/요리별 집계 (제공 횟수, 리뷰 수, 별점 합계, 추천 수)
+- dish_stats  : 식당/요리별 누적 집계 (평균 별점, 추천 비율, 제공 일수)
+- dish_trends : 식당/요리별 주간 집계와 최근 ROLLING_WEEKS 주 이동 평균 (SQL 윈도 함수)
+
+menus / reviews 테이블의 트리거가 바뀐 날짜를 analytics_dirty 에 기록하므로,
+refresh() 는 어느 프로세스에서 쓰기가 일어났든 바뀐 날짜와 그 날짜의 요리만 다시 계산합니다.
+요리는 dish_catalog 의 요리 ID 로 집계하고 이름은 조회할 때만 붙입니다.
+refresh() 는 크롤링 결과 저장(menu_store.publish_changes) 후와, 리뷰 커밋 후 쓰기 큐의 after_commit 스레드에서
+(db_writer.AFTER_COMMIT_INTERVAL 에 한 번씩 모아서) 호출되므로 통계 화면은 조회만 합니다.
+"""
+import argparse
+import sqlite3
+
+import dish_catalog
+import menu_store
+
+# 날짜 단위 리뷰를 붙일 식당 (리뷰 화면은 학생식당 기준 "오늘의 학식" 리뷰)
+REVIEW_RESTAURANT = "학생식당"
+
+# 이동 평균에 포함할 주 수 (현재 주 포함)
+ROLLING_WEEKS = 4
+
+# 순위에 포함할 최소 리뷰 수
+MIN_REVIEWS = 3
+
+# 순위 표시 개수
+TOP_N = 10
+
+# 요리 이름(dish)으로 집계하던 이전 버전의 통계 테이블 (다시 만들어서 전체 재계산)
+_DISH_TABLES = ('menu_dishes', 'dish_daily', 'dish_stats', 'dish_trends')
+
+def init_analytics_tables(conn):
+    """통계 테이블과 변경 기록 트리거 생성 (menus, reviews 테이블이 먼저 있어야 함)"""
+    c = conn.cursor()
+    created = c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analytics_dirty'"
+                        ).fetchone() is None
+    if 'dish' in {row[1] for row in c.execute("PRAGMA table_info(menu_dishes)")}:
+        for table in _DISH_TABLES:
+            c.execute(f"DROP TABLE IF EXISTS {table}")
+        created = True
+
+    # 다시 계산해야 하는 날짜 (YYYY-MM-DD)
+    c.execute('''CREATE TABLE IF NOT EXISTS analytics_dirty
+                 (date TEXT PRIMARY KEY)''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS menu_dishes
+                 (date TEXT, restaurant TEXT, category TEXT, dish_id INTEGER,
+                  PRIMARY KEY (date, restaurant, category, dish_id))''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS dish_daily
+                 (date TEXT, restaurant TEXT, dish_id INTEGER, served INTEGER,
+                  reviews INTEGER, rating_sum INTEGER, recommended INTEGER,
+                  PRIMARY KEY (date, restaurant, dish_id))''')
+    c.execute('''CREATE INDEX IF NOT EXISTS dish_daily_dish
+                 ON dish_daily (restaurant, dish_id, date)''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS dish_stats
+                 (restaurant TEXT, dish_id INTEGER, days_served INTEGER,
+                  reviews INTEGER, rating_sum INTEGER, recommended INTEGER,
+                  mean_rating REAL, recommend_rate REAL,
+                  first_served TEXT, last_served TEXT,
+                  PRIMARY KEY (restaurant, dish_id))''')
+    c.execute('''CREATE INDEX IF NOT EXISTS dish_stats_rating
+                 ON dish_stats (restaurant, mean_rating DESC)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS dish_stats_served
+                 ON dish_stats (restaurant, days_served DESC)''')
+
+    # week: 월요일 날짜, rolling_*: 최근 ROLLING_WEEKS 주 (달력 기준) 이동 평균
+    c.execute('''CREATE TABLE IF NOT EXISTS dish_trends
+                 (restaurant TEXT, dish_id INTEGER, week TEXT, days_served INTEGER,
+                  reviews INTEGER, rating_sum INTEGER, recommended INTEGER,
+                  rolling_rating REAL, rolling_recommend_rate REAL,
+                  PRIMARY KEY (restaurant, dish_id, week))''')
+
+    # 메뉴/리뷰가 바뀌면 해당 날짜를 기록 (api.py 등 다른 프로세스의 쓰기도 포함)
+    for table in ('menus', 'reviews'):
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_dirty_insert AFTER INSERT ON {table}
+                      BEGIN INSERT OR IGNORE INTO analytics_dirty (date) VALUES (NEW.date); END''')
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_dirty_update AFTER UPDATE ON {table}
+                      BEGIN
+                          INSERT OR IGNORE INTO analytics_dirty (date) VALUES (OLD.date);
+                          INSERT OR IGNORE INTO analytics_dirty (date) VALUES (NEW.date);
+                      END''')
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_dirty_delete AFTER DELETE ON {table}
+                      BEGIN INSERT OR IGNORE INTO analytics_dirty (date) VALUES (OLD.date); END''')
+
+    # 처음 만들 때는 기존 데이터 전체를 계산 대상으로 등록
+    if created:
+        c.execute("""INSERT OR IGNORE INTO analytics_dirty (date)
+                     SELECT date FROM menus UNION SELECT date FROM reviews""")
+
+    conn.commit()
+
+def _refresh_dishes(conn):
+    """계산 대상 날짜의 메뉴를 요리 단위로 다시 나눔"""
+    conn.execute("DELETE FROM menu_dishes WHERE date IN (SELECT date FROM temp.refresh_dates)")
+    rows = conn.execute("""SELECT date, restaurant, category, dish_ids FROM menus
+                           WHERE date IN (SELECT date FROM temp.refresh_dates)""").fetchall()
+    conn.executemany("INSERT OR IGNORE INTO menu_dishes (date, restaurant, category, dish_id) VALUES (?, ?, ?, ?)",
+                     [(date, restaurant, category, dish_id)
+                      for date, restaurant, category, dish_ids in rows
+                      for dish_id in dish_catalog.decode_ids(dish_ids)])
+
+def refresh(conn):
+    """
+    바뀐 날짜의 요리 집계와, 그 날짜에 제공된(또는 제공되었던) 요리의 누적/추세 통계만 다시 계산
+    반환값: 다시 계산한 날짜 수
+    """
+    # 통계 테이블이 없는 데이터베이스 (init_analytics_tables 전, api.py 전용 저장소 등)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analytics_dirty'").fetchone() is None:
+        return 0
+    if conn.execute("SELECT 1 FROM analytics_dirty LIMIT 1").fetchone() is None:
+        return 0
+
+    # 계산하는 동안 들어오는 쓰기는 커밋 후 다음 refresh 에서 처리되도록 쓰기 잠금을 먼저 획득
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS refresh_dates (date TEXT PRIMARY KEY)")
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS refresh_keys (restaurant TEXT, dish_id INTEGER, PRIMARY KEY (restaurant, dish_id))")
+        conn.execute("DELETE FROM temp.refresh_dates")
+        conn.execute("DELETE FROM temp.refresh_keys")
+        conn.execute("INSERT INTO temp.refresh_dates SELECT date FROM analytics_dirty")
+        conn.execute("DELETE FROM analytics_dirty")
+
+        # 이전에 이 날짜에 집계되었던 요리 (메뉴에서 빠진 요리도 누적 통계를 다시 계산)
+        conn.execute("""INSERT OR IGNORE INTO temp.refresh_keys
+                        SELECT restaurant, dish_id FROM dish_daily
+                        WHERE date IN (SELECT date FROM temp.refresh_dates)""")
+
+        _refresh_dishes(conn)
+
+        # 날짜별 집계: 그날의 리뷰를 REVIEW_RESTAURANT 에서 제공된 요리마다 붙임
+        conn.execute("DELETE FROM dish_daily WHERE date IN (SELECT date FROM temp.refresh_dates)")
+        conn.execute("""INSERT INTO dish_daily
+                        (date, restaurant, dish_id, served, reviews, rating_sum, recommended)
+                        SELECT d.date, d.restaurant, d.dish_id, COUNT(*),
+                               COALESCE(r.reviews, 0), COALESCE(r.rating_sum, 0), COALESCE(r.recommended, 0)
+                        FROM menu_dishes d
+                        LEFT JOIN (SELECT date, COUNT(*) AS reviews, SUM(rating) AS rating_sum,
+                                          SUM(recommended) AS recommended
+                                   FROM reviews
+                                   WHERE date IN (SELECT date FROM temp.refresh_dates)
+                                   GROUP BY date) r
+                               ON r.date = d.date AND d.restaurant = ?
+                        WHERE d.date IN (SELECT date FROM temp.refresh_dates)
+                        GROUP BY d.date, d.restaurant, d.dish_id""",
+                     (REVIEW_RESTAURANT,))
+
+        conn.execute("""INSERT OR IGNORE INTO temp.refresh_keys
+                        SELECT restaurant, dish_id FROM dish_daily
+                        WHERE date IN (SELECT date FROM temp.refresh_dates)""")
+
+        # 누적 집계 (대상 요리만)
+        conn.execute("""DELETE FROM dish_stats
+                        WHERE (restaurant, dish_id) IN (SELECT restaurant, dish_id FROM temp.refresh_keys)""")
+        conn.execute("""INSERT INTO dish_stats
+                        (restaurant, dish_id, days_served, reviews, rating_sum, recommended,
+                         mean_rating, recommend_rate, first_served, last_served)
+                        SELECT restaurant, dish_id, COUNT(*), SUM(reviews), SUM(rating_sum), SUM(recommended),
+                               SUM(rating_sum) * 1.0 / NULLIF(SUM(reviews), 0),
+                               SUM(recommended) * 1.0 / NULLIF(SUM(reviews), 0),
+                               MIN(date), MAX(date)
+                        FROM dish_daily JOIN temp.refresh_keys USING (restaurant, dish_id)
+                        GROUP BY restaurant, dish_id""")
+
+        # 주간 추세 (대상 요리만, 최근 ROLLING_WEEKS 주 이동 평균)
+        conn.execute("""DELETE FROM dish_trends
+                        WHERE (restaurant, dish_id) IN (SELECT restaurant, dish_id FROM temp.refresh_keys)""")
+        conn.execute("""INSERT INTO dish_trends
+                        (restaurant, dish_id, week, days_served, reviews, rating_sum, recommended,
+                         rolling_rating, rolling_recommend_rate)
+                        SELECT restaurant, dish_id, week, days_served, reviews, rating_sum, recommended,
+                               SUM(rating_sum) OVER w * 1.0 / NULLIF(SUM(reviews) OVER w, 0),
+                               SUM(recommended) OVER w * 1.0 / NULLIF(SUM(reviews) OVER w, 0)
+                        FROM (SELECT restaurant, dish_id, date(date, 'weekday 0', '-6 days') AS week,
+                                     COUNT(*) AS days_served, SUM(reviews) AS reviews,
+                                     SUM(rating_sum) AS rating_sum, SUM(recommended) AS recommended
+                              FROM dish_daily JOIN temp.refresh_keys USING (restaurant, dish_id)
+                              GROUP BY restaurant, dish_id, week)
+                        WINDOW w AS (PARTITION BY restaurant, dish_id ORDER BY julianday(week)
+                                     RANGE BETWEEN ? PRECEDING AND CURRENT ROW)""",
+                     ((ROLLING_WEEKS - 1) * 7,))
+
+        count = conn.execute("SELECT COUNT(*) FROM temp.refresh_dates").fetchone()[0]
+        conn.commit()
+        return count
+    except Exception:
+        conn.rollback()
+        raise
+
+def top_rated(conn, restaurant=None, min_reviews=MIN_REVIEWS, limit=TOP_N):
+    """평균 별점 상위 요리 (restaurant, dish, mean_rating, recommend_rate, reviews, days_served)"""
+    query = """SELECT s.restaurant, d.name, s.mean_rating, s.recommend_rate, s.reviews, s.days_served
+               FROM dish_stats s JOIN dishes d ON d.id = s.dish_id
+               WHERE s.mean_rating IS NOT NULL AND s.reviews >= ?"""
+    params = [min_reviews]
+    if restaurant:
+        query += " AND s.restaurant = ?"
+        params.append(restaurant)
+    query += " ORDER BY s.mean_rating DESC LIMIT ?"
+    params.append(limit)
+    return conn.execute(query, params).fetchall()
+
+def most_served(conn, restaurant=None, limit=TOP_N):
+    """자주 나오는 요리 (restaurant, dish, days_served, mean_rating, recommend_rate, last_served)"""
+    query = """SELECT s.restaurant, d.name, s.days_served, s.mean_rating, s.recommend_rate, s.last_served
+               FROM dish_stats s JOIN dishes d ON d.id = s.dish_id"""
+    params = []
+    if restaurant:
+        query += " WHERE s.restaurant = ?"
+        params.append(restaurant)
+    query += " ORDER BY s.days_served DESC LIMIT ?"
+    params.append(limit)
+    return conn.execute(query, params).fetchall()
+
+def dish_trend(conn, restaurant, dish):
+    """요리(이름 또는 동의어)의 주간 추세 (week, days_served, reviews, rolling_rating, rolling_recommend_rate)"""
+    return conn.execute("""SELECT week, days_served, reviews, rolling_rating, rolling_recommend_rate
+                           FROM dish_trends WHERE restaurant = ? AND dish_id = ?
+                           ORDER BY week""", (restaurant, dish_catalog.find(conn, dish))).fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description="요리별 리뷰 통계 갱신")
+    parser.add_argument('--db', default=menu_store.DB_PATH, help="데이터베이스 경로")
+    parser.add_argument('--rebuild', action='store_true', help="모든 날짜를 다시 계산")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    menu_store.init_menu_tables(conn)
+    conn.execute('''CREATE TABLE IF NOT EXISTS reviews
+                    (date TEXT, username TEXT, rating INTEGER,
+                     review_text TEXT, recommended BOOLEAN)''')
+    init_analytics_tables(conn)
+    if args.rebuild:
+        with conn:
+            conn.execute("""INSERT OR IGNORE INTO analytics_dirty (date)
+                            SELECT date FROM menus UNION SELECT date FROM reviews""")
+
+    print(f"다시 계산한 날짜: {refresh(conn)}")
+    for restaurant, dish, mean_rating, recommend_rate, reviews, days_served in top_rated(conn):
+        print(f"{restaurant} {dish}: 평균 {mean_rating:.2f} / 추천 {recommend_rate:.0%} "
+              f"(리뷰 {reviews}, 제공 {days_served}일)")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+읽기 전용 JSON 메뉴 API (Streamlit 없이 저장된 메뉴를 바로 제공)
+
+실행: python api.py --port 8502
+
+GET /api/menu/today                         오늘의 메뉴
+GET /api/menu/week?date=YYYY-MM-DD          해당 날짜가 속한 주의 메뉴 (date 생략 시 이번 주)
+                                            이번 주 ± CRAWL_WINDOW_WEEKS 주만 크롤링, 그 밖의 주는 저장된 메뉴만
+GET /api/menu?start=YYYY-MM-DD&end=...      기간 메뉴 (최대 MAX_RANGE_DAYS일, 저장된 메뉴만)
+공통 파라미터: restaurant=학생식당|교직원식당
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytz
+
+import menu_diff
+import menu_store
+
+# 응답 캐시 유효 시간 (초) 및 클라이언트 캐시 설정
+RESPONSE_TTL = 60
+CACHE_CONTROL = "public, max-age=300"
+
+# 메모리에 캐시하는 응답 최대 개수 (기간 조회는 조합이 많으므로 오래 안 쓴 응답부터 제거)
+MAX_CACHE_ENTRIES = 256
+
+MAX_RANGE_DAYS = 366
+
+# 요청으로 크롤링할 수 있는 주 범위 (이번 주 기준 앞뒤 주 수)
+CRAWL_WINDOW_WEEKS = 1
+
+# 크롤링에 실패해서 저장된 메뉴를 대신 보낼 때는 캐시하지 않음 (다음 요청에서 다시 시도)
+WARNING_CACHE_CONTROL = "no-store"
+
+class APIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def today():
+    """한국 시간 기준 오늘 날짜"""
+    return datetime.now(pytz.timezone('Asia/Seoul')).date()
+
+def in_crawl_window(monday, window=CRAWL_WINDOW_WEEKS):
+    """이번 주 기준 앞뒤 window 주 안의 주인지 (임의 날짜로 원본 사이트를 크롤링하지 않도록 제한)"""
+    return abs((monday - menu_store.week_start(today())).days) <= window * 7
+
+def parse_etags(header):
+    """If-None-Match 헤더를 ETag 목록으로 변환 (약한 비교: W/ 접두사 무시, '*' 는 그대로)"""
+    etags = []
+    for etag in header.split(','):
+        etag = etag.strip()
+        if etag.startswith('W/'):
+            etag = etag[2:]
+        if etag:
+            etags.append(etag)
+    return etags
+
+class MenuAPI:
+    """
+    요청 경로를 JSON 응답으로 변환
+    렌더링된 응답은 RESPONSE_TTL 동안 최대 MAX_CACHE_ENTRIES 개까지 메모리에 캐시 (LRU)
+    연결은 요청 스레드마다 따로 쓰므로 한 주의 크롤링이 다른 요청을 막지 않음
+    (같은 주를 동시에 요청하면 menu_store.ensure_week 가 크롤링 하나로 합침)
+    메뉴가 바뀌면 (menu_diff 변경 이벤트) 바뀐 날짜가 포함된 응답을 캐시에서 바로 제거
+    """
+
+    def __init__(self, connect=menu_store.connect, crawl=True, max_entries=MAX_CACHE_ENTRIES):
+        self._connect = connect
+        self._local = threading.local()
+        self.crawl = crawl
+        self.max_entries = max_entries
+        self._cache_lock = threading.Lock()
+        self._cache = OrderedDict()  # (start, end, restaurant) -> (body, etag, 만료 시각)
+        self._generation = 0  # 무효화 횟수 (렌더링 도중 무효화되면 그 결과는 캐시하지 않음)
+        menu_diff.subscribe(self.invalidate)
+
+    def close(self):
+        menu_diff.unsubscribe(self.invalidate)
+
+    def invalidate(self, changes):
+        """바뀐 날짜가 기간에 포함된 응답을 캐시에서 제거 (menu_diff 수신 함수)"""
+        dates = {menu_store.to_date(day) for day in menu_diff.changed_dates(changes)}
+        with self._cache_lock:
+            self._generation += 1
+            for key in [key for key in self._cache if any(key[0] <= day <= key[1] for day in dates)]:
+                del self._cache[key]
+
+    @property
+    def conn(self):
+        """현재 스레드의 저장소 연결"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _resolve(self, path, query):
+        """요청을 (start, end, restaurant, crawl_week) 로 변환"""
+        restaurant = query.get('restaurant')
+        if restaurant and restaurant not in menu_store.RESTAURANTS:
+            raise APIError(400, f"알 수 없는 식당입니다: {restaurant}")
+
+        try:
+            if path == '/api/menu/today':
+                day = today()
+                return day, day, restaurant, day
+            if path == '/api/menu/week':
+                day = menu_store.to_date(query['date']) if 'date' in query else today()
+                monday = menu_store.week_start(day)
+                crawl_week = monday if in_crawl_window(monday) else None
+                return monday, monday + timedelta(days=6), restaurant, crawl_week
+            if path == '/api/menu':
+                if 'start' not in query:
+                    raise APIError(400, "start 파라미터가 필요합니다.")
+                start = menu_store.to_date(query['start'])
+                end = menu_store.to_date(query.get('end', query['start']))
+                if end < start or (end - start).days >= MAX_RANGE_DAYS:
+                    raise APIError(400, f"기간은 1~{MAX_RANGE_DAYS}일이어야 합니다.")
+                return start, end, restaurant, None
+        except ValueError:
+            raise APIError(400, "날짜 형식은 YYYY-MM-DD 입니다.")
+
+        raise APIError(404, "존재하지 않는 경로입니다.")
+
+    def _render(self, start, end, restaurant, crawl_week):
+        """(body, etag, warning) 반환 (warning: 크롤링에 실패해서 저장된 메뉴를 대신 보낸 경우 오류 메시지)"""
+        conn = self.conn
+        error = None
+        if crawl_week is not None and self.crawl:
+            error = menu_store.ensure_week(conn, crawl_week)
+        menus = menu_store.load_menus(conn, start, end, restaurant)
+        if error and not menus:
+            raise APIError(502, error)
+
+        payload = {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'restaurant': restaurant,
+            'menus': menus,
+        }
+        if error:
+            payload['warning'] = error
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        return body, etag, error
+
+    def get(self, path, query):
+        """(body, etag, cache_control) 반환, 실패 시 APIError"""
+        start, end, restaurant, crawl_week = self._resolve(path, query)
+        key = (start, end, restaurant)
+
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[2] > time.monotonic():
+                self._cache.move_to_end(key)
+                return cached[0], cached[1], CACHE_CONTROL
+            generation = self._generation
+
+        body, etag, warning = self._render(start, end, restaurant, crawl_week)
+        if warning:
+            return body, etag, WARNING_CACHE_CONTROL
+        self._store(key, body, etag, generation)
+        return body, etag, CACHE_CONTROL
+
+    def _store(self, key, body, etag, generation):
+        """응답 캐시에 저장 (만료된 응답을 먼저 지우고, 그래도 넘치면 오래 안 쓴 응답부터 제거)"""
+        now = time.monotonic()
+        with self._cache_lock:
+            if generation != self._generation:
+                return  # 렌더링하는 동안 메뉴가 바뀌었으면 이전 메뉴일 수 있으므로 캐시하지 않음
+            self._cache[key] = (body, etag, now + RESPONSE_TTL)
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.max_entries:
+                for expired in [k for k, cached in self._cache.items() if cached[2] <= now]:
+                    del self._cache[expired]
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+class MenuRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    # 헤더와 본문을 한 번에 전송 (keep-alive 연결에서 Nagle 지연 방지)
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    api = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        try:
+            body, etag, cache_control = self.api.get(url.path.rstrip('/'), query)
+        except APIError as e:
+            self._send_error(e.status, e.message)
+            return
+        except Exception:
+            # 예상하지 못한 오류 (저장소 잠금/손상 등) 도 연결을 끊지 않고 같은 형식으로 응답
+            traceback.print_exc()
+            self._send_error(500, "서버 내부 오류가 발생했습니다.")
+            return
+
+        headers = {'ETag': etag, 'Cache-Control': cache_control}
+        etags = parse_etags(self.headers.get('If-None-Match', ''))
+        if '*' in etags or etag in etags:
+            self._send(304, b'', headers=headers)
+        else:
+            self._send(200, body, headers=headers)
+
+    def _send_error(self, status, message):
+        body = json.dumps({'error': message}, ensure_ascii=False).encode('utf-8')
+        self._send(status, body, headers={'Cache-Control': 'no-store'})
+
+    def _send(self, status, body, headers):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    do_HEAD = do_GET
+
+    def log_message(self, format, *args):
+        # 요청마다 로그를 남기지 않음 (처리량 확보)
+        pass
+
+def make_server(host, port, connect=menu_store.connect, crawl=True):
+    """API 서버 생성 (connect: 요청 스레드마다 저장소 연결을 만드는 함수)"""
+    handler = type('Handler', (MenuRequestHandler,), {
+        'api': MenuAPI(connect, crawl=crawl),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="KUS Meals JSON 메뉴 API")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--no-crawl', action='store_true', help="저장된 메뉴만 제공 (크롤링하지 않음)")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, crawl=not args.no_crawl)
+    print(f"KUS Meals API: http://{args.host}:{args.port}/api/menu/today")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.RequestHandlerClass.api.close()
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,20 @@ import pandas as pd
 import hashlib
 import os
 import json
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta
-import pytz
 import sqlite3
-from crawling import get_today_menu, get_weekly_menu
-from utils import get_current_date
+from utils import KOREA_TZ, get_current_date
+import analytics
+import db_writer
+import llm
+import menu_diff
+import menu_model
+import menu_store
+import profiling
+import snapshot
+from render import TABLE_STYLE, menu_table_html
 
 # 개발 모드 설정
 DEV_MODE = True  # 개발 중일 때만 True로 설정
@@ -21,9 +29,10 @@ st.set_page_config(
     layout="wide"  # 전체 화면 사용
 )
 
-# 데이터베이스 초기화
+# 프로세스 초기화 (모든 세션이 공유하며 프로세스당 한 번만 실행)
+@st.cache_resource
 def init_db():
-    conn = sqlite3.connect('data.db', check_same_thread=False)
+    conn = sqlite3.connect(menu_store.DB_PATH)
     c = conn.cursor()
     
     # 사용자 테이블 생성
@@ -40,34 +49,81 @@ def init_db():
                  (username TEXT PRIMARY KEY, preferences TEXT)''')
     
     conn.commit()
-    return conn
-
-# 데이터베이스 연결
-if 'db_connection' not in st.session_state:
-    st.session_state.db_connection = init_db()
-
-# 캐시 설정
-@st.cache_data(ttl=3600)  # 1시간 캐시
-def cached_get_today_menu():
-    return get_today_menu()
+    
+    # 메뉴 저장소 테이블 생성 (api.py 와 공유)
+    menu_store.init_menu_tables(conn)
+    
+    # 요리별 통계 테이블 생성 (메뉴/리뷰 테이블 이후), 이전 실행에서 남은 변경 날짜 반영
+    analytics.init_analytics_tables(conn)
+    analytics.refresh(conn)
+    conn.close()
+    return True
+
+def connect_db():
+    """세션별 데이터베이스 연결 (테이블 생성은 init_db 에서 한 번만)"""
+    init_db()
+    return sqlite3.connect(menu_store.DB_PATH, check_same_thread=False)
+
+@st.cache_resource
+def get_write_queue():
+    """리뷰/선호도 쓰기 큐 (프로세스당 하나의 백그라운드 작성자, 커밋 후 요리별 통계도 작성자가 갱신)"""
+    init_db()
+    return db_writer.WriteQueue(menu_store.DB_PATH, after_commit=analytics.refresh)
+
+# 주간 메뉴 공유 객체 (모든 세션이 같은 읽기 전용 객체를 참조, 복사/역직렬화 없음)
+@st.cache_resource
+def get_menu_registry():
+    """주간 메뉴 레지스트리 (크롤링이 필요할 때만 crawling 모듈 로드)"""
+    init_db()
+    registry = menu_model.MenuRegistry(menu_store.connect)
+    menu_diff.subscribe(registry.on_menu_changes)
+    return registry
+
+@st.cache_resource
+def get_menu_loader():
+    """주간 메뉴 백그라운드 로더 (크롤링하는 동안 화면의 나머지 부분을 먼저 표시)"""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="kus-menu")
+
+def _get_week_menu(registry, week_date):
+    """registry.get 과 같지만 예외 대신 오류가 담긴 WeekMenu 반환 (페이지의 나머지 부분은 계속 표시)"""
+    try:
+        return registry.get(week_date)
+    except Exception as e:
+        return menu_model.error_week_menu(menu_store.week_start(week_date),
+                                          f"메뉴를 불러오는 중 오류가 발생했습니다: {str(e)}")
 
-@st.cache_data(ttl=3600)  # 1시간 캐시
-def cached_get_weekly_menu():
-    return get_weekly_menu()
+def load_week_menu(week_date):
+    """
+    주간 메뉴 요청 (WeekMenu 로 완료되는 Future 반환, 불러오기에 실패하면 WeekMenu.error 에 오류)
+    공유 객체가 준비되어 있으면 바로 완료, 크롤링이 필요하면 백그라운드에서 진행
+    """
+    registry = get_menu_registry()
+    week = registry.cached(week_date)
+    if week is None:
+        return get_menu_loader().submit(_get_week_menu, registry, week_date)
+    
+    future = Future()
+    future.set_result(week)
+    return future
+
+# 세션 상태 기본값
+SESSION_DEFAULTS = {
+    'is_logged_in': False,
+    'username': None,
+    'user_name': None,
+}
 
-# 현재 날짜 정보
-korea_tz = pytz.timezone('Asia/Seoul')
-now = datetime.now(korea_tz)
+def init_session_state():
+    """세션별 초기화 (새 세션의 첫 실행에서만 값이 설정됨)"""
+    if 'db_connection' not in st.session_state:
+        st.session_state.db_connection = connect_db()
+    for key, value in SESSION_DEFAULTS.items():
+        if key not in st.session_state:
+            st.session_state[key] = value
+    if 'test_date' not in st.session_state:
+        st.session_state.test_date = datetime.now(KOREA_TZ)
 
-# 세션 상태 초기화
-if 'is_logged_in' not in st.session_state:
-    st.session_state.is_logged_in = False
-if 'username' not in st.session_state:
-    st.session_state.username = None
-if 'user_name' not in st.session_state:
-    st.session_state.user_name = None
-if 'test_date' not in st.session_state:
-    st.session_state.test_date = now
+init_session_state()
 
 def get_current_date():
     """현재 날짜 반환 (테스트 날짜 또는 실제 날짜)"""
@@ -157,38 +213,35 @@ def get_todays_reviews():
     )
 
 def save_review(username, rating, review_text, recommended):
-    """리뷰 저장"""
+    """리뷰 저장 (쓰기 큐에서 커밋될 때까지 대기)"""
     try:
-        conn = st.session_state.db_connection
-        c = conn.cursor()
         current_date = get_current_date()
         today_date = current_date.strftime("%Y-%m-%d")
         
-        # 같은 날짜의 기존 리뷰 삭제
-        c.execute("DELETE FROM reviews WHERE date = ? AND username = ?",
-                 (today_date, username))
-        
-        # 새 리뷰 추가
-        c.execute("""INSERT INTO reviews 
-                    (date, username, rating, review_text, recommended)
-                    VALUES (?, ?, ?, ?, ?)""",
-                 (today_date, username, rating, review_text, recommended))
-        conn.commit()
+        get_write_queue().execute([
+            # 같은 날짜의 기존 리뷰 삭제
+            ("DELETE FROM reviews WHERE date = ? AND username = ?",
+             (today_date, username)),
+            # 새 리뷰 추가
+            ("""INSERT INTO reviews 
+                (date, username, rating, review_text, recommended)
+                VALUES (?, ?, ?, ?, ?)""",
+             (today_date, username, rating, review_text, recommended)),
+        ])
         return True
     except Exception as e:
         st.error(f"리뷰 저장 중 오류가 발생했습니다: {str(e)}")
         return False
 
 def save_preferences(username, preferences):
-    """사용자 선호도 저장"""
+    """사용자 선호도 저장 (쓰기 큐에서 커밋될 때까지 대기)"""
     try:
-        conn = st.session_state.db_connection
-        c = conn.cursor()
         preferences_json = json.dumps(preferences, ensure_ascii=False)
         
-        c.execute("INSERT OR REPLACE INTO preferences (username, preferences) VALUES (?, ?)",
-                 (username, preferences_json))
-        conn.commit()
+        get_write_queue().execute([
+            ("INSERT OR REPLACE INTO preferences (username, preferences) VALUES (?, ?)",
+             (username, preferences_json)),
+        ])
         return True
     except Exception as e:
         st.error(f"선호도 저장 중 오류가 발생했습니다: {str(e)}")
@@ -208,133 +261,99 @@ def load_preferences():
         st.error(f"선호도 로드 중 오류가 발생했습니다: {str(e)}")
         return {}
 
-def get_menu_recommendation(menu_df, user_preferences):
-    # 메뉴 텍스트 추출
-    menu_text = "오늘의 메뉴:\n"
-    for _, row in menu_df.iterrows():
-        if today_str in row['날짜']:
-            menu_text += f"{row['구분']}: {row['메뉴']}\n"
-    
-    # 사용자 취향 텍스트 생성
-    pref_text = "사용자 취향:\n"
-    for category, items in user_preferences.items():
-        if items:  # 선택된 항목이 있는 경우만
-            if category == "알레르기 정보":
-                pref_text += f"⚠️ 알레르기: {', '.join(items)}\n"
-            else:
-                pref_text += f"{category}: {', '.join(items)}\n"
-    
-    # Gemini 프롬프트 생성
-    prompt = f"""
-당신은 사용자의 음식 취향과 알레르기를 고려하여 학식 메뉴를 추천하는 전문가입니다.
-다음 정보를 바탕으로 오늘 학식을 먹을지 추천해주세요:
-
-{menu_text}
-
-{pref_text}
-
-다음 형식으로 답변해주세요:
-1. 추천 여부 (한 문장)
-2. 추천 이유 또는 비추천 이유 (2-3문장)
-3. 주의사항 (알레르기 관련 주의사항이 있다면 반드시 포함)
-"""
-    
+@st.cache_resource
+def get_recommendation_model():
+    """추천 모델 로드 (API 키가 없으면 None, KUS_FAKE_LLM=1 이면 가짜 모델 사용)"""
     try:
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        return f"메뉴 추천 중 오류가 발생했습니다: {str(e)}"
-
+        api_key = st.secrets.get("GEMINI_API_KEY")
+    except FileNotFoundError:
+        api_key = None
+    model = llm.get_model(api_key)
+    if model is None and llm.fake_model_enabled():
+        model = llm.FakeStreamingModel()
+    return model
+
+@st.cache_resource
+def get_recommendation_cache():
+    """추천 결과 캐시 (메뉴가 바뀐 날짜만 무효화)"""
+    cache = llm.RecommendationCache()
+    menu_diff.subscribe(cache.on_menu_changes)
+    return cache
+
+def stream_menu_recommendation(model, menu_items, user_preferences):
+    """메뉴 추천 (토큰이 도착하는 대로 화면에 표시, 같은 조건의 추천은 캐시 사용)"""
+    prompt = llm.build_recommendation_prompt(menu_items, user_preferences)
+    cache = get_recommendation_cache()
+    today_date = get_current_date().strftime("%Y-%m-%d")
+    
+    cached = cache.get(today_date, prompt)
+    if cached is not None:
+        st.markdown(cached)
+        return cached
+    
+    return st.write_stream(llm.stream_recommendation(
+        model, prompt,
+        on_complete=lambda text: cache.put(today_date, prompt, text)
+    ))
+
+def load_user_preferences(username):
+    """사용자 취향 로드 (저장된 취향이 없으면 빈 dict)"""
+    return load_preferences().get(username, {})
+
+# 위젯을 바꿔도 이 섹션만 다시 실행
+@st.fragment
 def display_preference_settings():
+    """취향 설정 (저장 버튼을 누를 때만 제출되고 저장됨)"""
     st.subheader("🍽️ 음식 취향 설정")
     
     # 현재 사용자의 취향 불러오기
-    all_prefs = load_preferences()
-    user_prefs = all_prefs.get(st.session_state.username, {})
-    
-    # 취향 설정 UI
-    new_prefs = {}
+    user_prefs = load_user_preferences(st.session_state.username)
     
     # 알레르기 정보를 맨 위로 이동
     categories = ["알레르기 정보"] + [cat for cat in TASTE_PREFERENCES.keys() if cat != "알레르기 정보"]
     
-    for category in categories:
-        if category == "알레르기 정보":
-            st.write("### ⚠️ 알레르기 정보")
-            st.write("알레르기가 있는 식재료를 모두 선택해주세요.")
-        else:
-            st.write(f"### {category}")
-        
-        selected = st.multiselect(
-            "선택해주세요 (여러 개 선택 가능)",
-            TASTE_PREFERENCES[category],
-            default=user_prefs.get(category, []),
-            key=f"pref_{category}"
-        )
-        new_prefs[category] = selected
+    # 폼 안의 위젯은 선택을 바꿔도 재실행하지 않음
+    with st.form("preference_form"):
+        new_prefs = {}
+        for category in categories:
+            if category == "알레르기 정보":
+                st.write("### ⚠️ 알레르기 정보")
+                st.write("알레르기가 있는 식재료를 모두 선택해주세요.")
+            else:
+                st.write(f"### {category}")
+            
+            new_prefs[category] = st.multiselect(
+                "선택해주세요 (여러 개 선택 가능)",
+                TASTE_PREFERENCES[category],
+                default=user_prefs.get(category, []),
+                key=f"pref_{category}"
+            )
+            
+            # 알레르기 선택 시 주의사항 표시 (저장된 취향 기준)
+            if category == "알레르기 정보" and user_prefs.get(category):
+                st.warning("⚠️ 선택하신 알레르기 유발 식품이 포함된 메뉴는 피하시는 것이 좋습니다.")
         
-        # 알레르기 선택 시 주의사항 표시
-        if category == "알레르기 정보" and selected:
-            st.warning("⚠️ 선택하신 알레르기 유발 식품이 포함된 메뉴는 피하시는 것이 좋습니다.")
-    
-    # 저장 버튼
-    if st.button("취향 저장"):
-        save_preferences(st.session_state.username, new_prefs)
-        st.success("취향이 저장되었습니다!")
-        return new_prefs
-    
-    return user_prefs
-
-def format_menu_text(menu_text):
-    """메뉴 텍스트를 보기 좋게 포맷팅"""
-    if pd.isna(menu_text):
-        return ""
-    
-    # 메뉴 항목을 쉼표나 슬래시로 구분
-    items = []
-    for item in str(menu_text).replace('/', ',').split(','):
-        # 각 항목 앞뒤 공백 제거
-        item = item.strip()
-        # 긴 단어에 띄어쓰기 추가 (예: 치킨마요덮밥 -> 치킨마요 덮밥)
-        if len(item) > 4 and '덮밥' in item:
-            item = item.replace('덮밥', ' 덮밥')
-        if len(item) > 4 and '김밥' in item:
-            item = item.replace('김밥', ' 김밥')
-        if len(item) > 4 and '라면' in item:
-            item = item.replace('라면', ' 라면')
-        if len(item) > 4 and '우동' in item:
-            item = item.replace('우동', ' 우동')
-        if len(item) > 4 and '국수' in item:
-            item = item.replace('국수', ' 국수')
-        items.append(item)
-    
-    # 쉼표와 공백으로 메뉴 항목 구분
-    return ', '.join(items)
-
-def align_menus_by_date(student_df, staff_df):
-    """학생식당과 교직원식당 메뉴를 날짜별로 정렬"""
-    # 데이터프레임 복사
-    student = student_df.copy()
-    staff = staff_df.copy()
-    
-    # 메뉴 텍스트 포맷팅
-    student['메뉴'] = student['메뉴'].apply(format_menu_text)
-    staff['메뉴'] = staff['메뉴'].apply(format_menu_text)
-    
-    # 날짜별로 정렬
-    student = student.sort_values(['날짜', '구분'])
-    staff = staff.sort_values(['날짜', '구분'])
-    
-    return student, staff
-
-def display_menu_dataframe(df, title, current_date_str=None):
+        # 저장 버튼
+        submitted = st.form_submit_button("취향 저장")
+    
+    if submitted:
+        if save_preferences(st.session_state.username, new_prefs):
+            st.success("취향이 저장되었습니다!")
+
+def display_menu_dataframe(items, title, current_date_str=None):
     """
-    메뉴 데이터프레임을 표시
+    메뉴 항목(menu_model.MenuItem)을 표 형태로 표시
     current_date_str: 현재 날짜 문자열 (MM.DD 형식)
     """
-    if df.empty:
+    if not items:
         st.info(f"{title}의 메뉴 정보가 없습니다.")
     else:
+        # 표시할 열만으로 작은 데이터프레임 생성
+        df = pd.DataFrame(
+            [(item.date_str, item.category, item.display) for item in items],
+            columns=['날짜', '구분', '메뉴']
+        )
+        
         # 오늘 날짜 행 강조를 위한 스타일링
         def highlight_today(row):
             if current_date_str and current_date_str in row['날짜']:
@@ -366,61 +385,88 @@ def display_menu_dataframe(df, title, current_date_str=None):
             height=min(35 + len(df) * 35, 500)  # 행 수에 따른 적절한 높이 설정
         )
 
-def get_weekday_name(date_str):
-    """날짜 문자열(MM.DD)을 받아서 해당 요일을 반환"""
-    try:
-        # 현재 연도와 날짜 문자열을 조합
-        current_year = now.year
-        date_obj = datetime.strptime(f"{current_year}.{date_str}", "%Y.%m.%d")
-        weekdays = ["월요일", "화요일", "수요일", "목요일", "금요일", "토요일", "일요일"]
-        return weekdays[date_obj.weekday()]
-    except:
-        return ""
-
-def display_weekly_menu(student_df, staff_df):
+def display_weekly_menu(week):
     """주간 메뉴를 요일별로 표시"""
-    # 데이터프레임에 요일 정보 추가
-    student_df = student_df.copy()
-    staff_df = staff_df.copy()
-    
-    student_df['요일'] = student_df['날짜'].apply(get_weekday_name)
-    staff_df['요일'] = staff_df['날짜'].apply(get_weekday_name)
-    
-    # 주말 제외
-    weekdays = ["월요일", "화요일", "수요일", "목요일", "금요일"]
-    student_df = student_df[student_df['요일'].isin(weekdays)]
-    staff_df = staff_df[staff_df['요일'].isin(weekdays)]
-    
     # 현재 날짜
     current_date_str = get_current_date().strftime("%m.%d")
     
-    # 요일별로 탭 생성
-    for weekday in weekdays:
+    # 요일별로 탭 생성 (주말 제외)
+    for offset, weekday in enumerate(menu_model.WEEKDAYS[:5]):
+        day = week.monday + timedelta(days=offset)
         with st.expander(f"📅 {weekday}", expanded=(weekday == "월요일")):
             col1, col2 = st.columns(2)
             
             # 학생 식당 메뉴
             with col1:
                 st.markdown(f"#### 📍 학생 식당")
-                day_student = student_df[student_df['요일'] == weekday].copy()
-                if not day_student.empty:
-                    # 표시할 열 선택 및 이름 변경
-                    display_df = day_student[['날짜', '구분', '메뉴']].copy()
-                    display_menu_dataframe(display_df, f"학생 식당 - {weekday}", current_date_str)
+                day_student = week.day(day, "학생식당")
+                if day_student:
+                    display_menu_dataframe(day_student, f"학생 식당 - {weekday}", current_date_str)
                 else:
                     st.info(f"{weekday} 학생 식당 메뉴 정보가 없습니다.")
             
             # 교직원 식당 메뉴
             with col2:
                 st.markdown(f"#### 📍 교직원 식당")
-                day_staff = staff_df[staff_df['요일'] == weekday].copy()
-                if not day_staff.empty:
-                    # 표시할 열 선택 및 이름 변경
-                    display_df = day_staff[['날짜', '구분', '메뉴']].copy()
-                    display_menu_dataframe(display_df, f"교직원 식당 - {weekday}", current_date_str)
+                day_staff = week.day(day, "교직원식당")
+                if day_staff:
+                    display_menu_dataframe(day_staff, f"교직원 식당 - {weekday}", current_date_str)
                 else:
                     st.info(f"{weekday} 교직원 식당 메뉴 정보가 없습니다.")
 
+def display_dish_stats():
+    """
+    요리별 리뷰 통계 (미리 계산된 통계 테이블만 조회)
+    통계는 크롤링 결과 저장(menu_store.publish_changes)과 리뷰 커밋(쓰기 큐 작성자) 후에 갱신됨
+    """
+    conn = st.session_state.db_connection
+    
+    restaurant = st.selectbox("식당", menu_store.RESTAURANTS, key="stats_restaurant")
+    top_rated = analytics.top_rated(conn, restaurant)
+    most_served = analytics.most_served(conn, restaurant)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("#### ⭐ 평균 별점 상위 요리")
+        if top_rated:
+            st.dataframe(
+                pd.DataFrame(
+                    [(dish, round(mean_rating, 2), f"{recommend_rate:.0%}", reviews, days_served)
+                     for _, dish, mean_rating, recommend_rate, reviews, days_served in top_rated],
+                    columns=['요리', '평균 별점', '추천 비율', '리뷰 수', '제공 일수']
+                ),
+                hide_index=True
+            )
+        else:
+            st.info(f"리뷰가 {analytics.MIN_REVIEWS}개 이상인 요리가 아직 없습니다.")
+    
+    with col2:
+        st.markdown("#### 🔁 자주 나오는 요리")
+        if most_served:
+            st.dataframe(
+                pd.DataFrame(
+                    [(dish, days_served, round(mean_rating, 2) if mean_rating is not None else None, last_served)
+                     for _, dish, days_served, mean_rating, _, last_served in most_served],
+                    columns=['요리', '제공 일수', '평균 별점', '최근 제공일']
+                ),
+                hide_index=True
+            )
+        else:
+            st.info("저장된 메뉴가 없습니다.")
+    
+    # 요리별 주간 추세
+    dishes = list(dict.fromkeys(row[1] for row in top_rated + most_served))
+    if dishes:
+        dish = st.selectbox("요리 선택", dishes, key="stats_dish")
+        trend = analytics.dish_trend(conn, restaurant, dish)
+        trend_df = pd.DataFrame(trend, columns=['주', '제공 일수', '리뷰 수', '평균 별점', '추천 비율'])
+        st.markdown(f"#### 📈 {dish} 주간 추세 (최근 {analytics.ROLLING_WEEKS}주 이동 평균)")
+        if trend_df['평균 별점'].notna().any():
+            st.line_chart(trend_df.set_index('주')[['평균 별점', '추천 비율']])
+        else:
+            st.info("아직 이 요리에 대한 리뷰가 없습니다.")
+
 def is_weekend():
     """현재 날짜가 주말인지 확인"""
     return get_current_date().weekday() >= 5
@@ -441,7 +487,7 @@ def display_date_override():
     
     # datetime 객체 생성 및 세션 상태 업데이트
     new_datetime = datetime.combine(selected_date, current_time)
-    new_datetime = pytz.timezone('Asia/Seoul').localize(new_datetime)
+    new_datetime = KOREA_TZ.localize(new_datetime)
     
     # 날짜가 변경되었을 때만 업데이트
     if new_datetime.date() != st.session_state.test_date.date():
@@ -449,10 +495,183 @@ def display_date_override():
         st.session_state.selected_date = new_datetime  # utils.py에서 사용할 selected_date 설정
         st.rerun()  # 페이지 새로고침
 
+def display_profiler_controls():
+    """개발자 도구: 다음 재실행 N회의 메뉴 화면 프로파일링"""
+    st.sidebar.markdown("#### ⏱️ 프로파일링")
+    
+    capture = st.session_state.get('profile_capture')
+    if capture is not None:
+        st.sidebar.info(f"프로파일링 중... (남은 재실행 {capture.runs_left}회)")
+        if st.sidebar.button("프로파일링 중지"):
+            del st.session_state.profile_capture
+            st.rerun()
+    else:
+        runs = st.sidebar.number_input("기록할 재실행 횟수", min_value=1, max_value=20, value=3, key="profile_runs")
+        if st.sidebar.button("프로파일링 시작"):
+            st.session_state.profile_capture = profiling.SamplingProfiler(runs)
+            st.session_state.pop('profile_result', None)
+            st.rerun()
+    
+    result = st.session_state.get('profile_result')
+    if result is not None:
+        st.sidebar.caption(f"재실행 {result.elapsed:.2f}초, 샘플 {result.samples}개")
+        st.sidebar.download_button(
+            "folded stacks 다운로드",
+            data=result.folded(),
+            file_name="kus_profile.folded",
+            mime="text/plain",
+            help="flamegraph.pl 또는 speedscope 에서 열 수 있습니다."
+        )
+        st.sidebar.dataframe(
+            pd.DataFrame(
+                [(label, f"{self_ratio:.0%}", f"{total_ratio:.0%}")
+                 for label, self_ratio, total_ratio in result.top_functions()],
+                columns=['함수', '자체', '누적']
+            ),
+            hide_index=True
+        )
+        st.sidebar.dataframe(
+            pd.DataFrame(
+                [(line, func, f"{ratio:.0%}") for line, func, ratio in result.top_lines()],
+                columns=['코드 줄', '함수', '비율']
+            ),
+            hide_index=True
+        )
+
+def run_menu_section():
+    """메뉴 화면 실행 (개발자 도구에서 프로파일링을 시작한 경우에만 프로파일러 적용)"""
+    capture = st.session_state.get('profile_capture')
+    if capture is None:
+        display_menu_section()
+        return
+    
+    try:
+        with capture:
+            display_menu_section()
+    finally:
+        if capture.done:
+            st.session_state.profile_result = capture
+            st.session_state.pop('profile_capture', None)
+    
+    # 마지막 기록이 끝나면 결과를 표시하기 위해 한 번 더 실행
+    if capture.done:
+        st.rerun()
+
+def display_recommendation_section(menu_items):
+    """AI 추천 섹션 (취향 설정 / 추천 결과)"""
+    if not st.session_state.is_logged_in:
+        st.info("AI 메뉴 추천을 이용하시려면 로그인이 필요합니다.")
+        return
+    
+    st.markdown("---")
+    st.subheader("🤖 AI 메뉴 추천")
+    
+    # 취향 설정 탭과 추천 결과 탭
+    tab1, tab2 = st.tabs(["취향 설정", "추천 결과"])
+    
+    with tab1:
+        display_preference_settings()
+    
+    with tab2:
+        model = get_recommendation_model()
+        if model is None:
+            st.info("🔒 추천 기능 비활성화 (GEMINI_API_KEY 가 설정되지 않았습니다)")
+        elif st.button("🤖 추천 받기"):
+            user_prefs = load_user_preferences(st.session_state.username)
+            stream_menu_recommendation(model, menu_items, user_prefs)
+
+def display_review_section():
+    """리뷰 섹션 (리뷰 목록 / 작성)"""
+    st.markdown("---")
+    st.subheader("🌟 리뷰")
+    
+    # 리뷰 목록 표시 (모든 사용자가 볼 수 있음)
+    display_reviews()
+    
+    # 리뷰 작성 UI (로그인한 사용자만)
+    if st.session_state.is_logged_in:
+        with st.expander("리뷰 작성하기"):
+            display_review_form()
+    else:
+        st.info("리뷰 작성하려면 로그인이 필요합니다.")
+
+# 위젯을 바꿔도 이 섹션만 다시 실행
+@st.fragment
+def display_review_form():
+    """리뷰 작성 폼 (저장 버튼을 누를 때만 제출되고 저장됨)"""
+    # 폼 안의 위젯은 별점/내용을 바꿔도 재실행하지 않음
+    with st.form("review_form"):
+        rating = st.slider("별점", 1, 5, 3)
+        review_text = st.text_area("리뷰 내용", placeholder="오늘의 학식은 어떠셨나요?")
+        recommended = st.checkbox("오늘의 학식 추천")
+        submitted = st.form_submit_button("리뷰 저장")
+    
+    if submitted:
+        if review_text.strip():
+            if save_review(
+                st.session_state.username,
+                rating,
+                review_text,
+                recommended
+            ):
+                st.success("리뷰가 저장되었습니다!")
+                st.rerun()  # 리뷰 목록까지 갱신
+        else:
+            st.error("리뷰 내용을 입력해주세요.")
+
+def display_todays_menu(current_date):
+    """
+    오늘의 메뉴 화면
+    메뉴 / AI 추천 / 리뷰 자리를 먼저 잡아 두고, 크롤링을 기다리지 않는 부분부터 채움
+    """
+    st.subheader("🍱 오늘의 학식 메뉴")
+    week_future = load_week_menu(current_date)  # 크롤링이 필요하면 백그라운드에서 진행
+    
+    # 화면 골격
+    menu_slot = st.empty()
+    ai_slot = st.empty()
+    review_slot = st.empty()
+    
+    # 미리 렌더링된 스냅샷이 있으면 메뉴 확인을 기다리지 않고 바로 표시
+    fragment = snapshot.load_day_fragment(current_date)
+    with menu_slot.container():
+        if fragment:
+            st.markdown("### 🍽️ 오늘의 학식 메뉴", unsafe_allow_html=True)
+            st.markdown(TABLE_STYLE + fragment, unsafe_allow_html=True)
+        else:
+            st.info("⏳ 메뉴를 불러오는 중입니다...")
+    if st.session_state.is_logged_in:
+        ai_slot.caption("🤖 AI 메뉴 추천을 준비하는 중입니다...")
+    
+    # 리뷰는 메뉴와 관계없으므로 먼저 표시
+    with review_slot.container():
+        display_review_section()
+    
+    week = week_future.result()
+    student_today = week.day(current_date, "학생식당")
+    staff_today = week.day(current_date, "교직원식당")
+    
+    if week.error or (not student_today and not staff_today):
+        # 메뉴가 없는 날은 추천/리뷰 섹션을 표시하지 않음
+        if week.error:
+            menu_slot.error(week.error)
+        else:
+            menu_slot.info("🏖️ 오늘은 식당을 운영하지 않습니다.")
+        ai_slot.empty()
+        review_slot.empty()
+        return
+    
+    if not fragment:
+        with menu_slot.container():
+            display_menu(student_today, staff_today, None)
+    
+    # AI 추천 섹션 (오늘의 학생식당 메뉴 필요)
+    with ai_slot.container():
+        display_recommendation_section(student_today)
+
 def display_menu_section():
     # 현재 시간 표시
     current_date = get_current_date()
-    today_str = current_date.strftime("%m.%d")
     today_date = current_date.strftime("%Y-%m-%d")
     
     st.write(f"현재 시간: {current_date.strftime('%Y년 %m월 %d일 %H:%M')}")
@@ -460,14 +679,23 @@ def display_menu_section():
     # 개발자 도구 표시
     if DEV_MODE:
         display_date_override()
+        display_profiler_controls()
         st.sidebar.markdown("---")
         
         # 실제 시간으로 초기화 버튼
         if st.sidebar.button("실제 시간으로 초기화"):
             if 'selected_date' in st.session_state:
                 del st.session_state.selected_date
-            st.session_state.test_date = datetime.now(pytz.timezone('Asia/Seoul'))
+            st.session_state.test_date = datetime.now(KOREA_TZ)
             st.rerun()
+        
+        # 선택한 날짜의 메뉴만 다시 가져오기 (바뀐 항목의 캐시만 무효화)
+        if st.sidebar.button("선택한 날짜 메뉴 다시 가져오기"):
+            changes, refresh_error = menu_store.refresh_day(st.session_state.db_connection, current_date)
+            if refresh_error:
+                st.sidebar.error(refresh_error)
+            else:
+                st.sidebar.success(f"변경된 메뉴 {len(changes)}건")
 
     # 주말 체크
     if is_weekend():
@@ -482,95 +710,33 @@ def display_menu_section():
     # 메뉴 보기 모드 선택
     mode = st.radio(
         "메뉴 보기 모드",
-        ["오늘의 메뉴", "이번 주 전체 메뉴"],
+        ["오늘의 메뉴", "이번 주 전체 메뉴", "메뉴 통계"],
         horizontal=True,
         key="menu_mode"
     )
     
     if mode == "오늘의 메뉴":
-        st.subheader("🍱 오늘의 학식 메뉴")
-        
-        student_df, staff_df, error = cached_get_today_menu()  # 캐시된 함수 사용
+        display_todays_menu(current_date)
+    elif mode == "이번 주 전체 메뉴":
+        st.subheader("📅 이번 주 전체 메뉴")
+        week_future = load_week_menu(get_current_date())  # 공유 메뉴 객체 사용
         
-        if error:
-            st.error(error)
+        # 크롤링이 끝날 때까지 자리 표시
+        if not week_future.done():
+            loading = st.info("⏳ 이번 주 메뉴를 불러오는 중입니다...")
+            week = week_future.result()
+            loading.empty()
         else:
-            # 메뉴 정렬 및 포맷팅
-            student_df, staff_df = align_menus_by_date(student_df, staff_df)
-            
-            # 오늘의 메뉴만 필터링 (정확한 날짜 비교)
-            student_today = student_df[student_df['날짜'] == today_str]
-            staff_today = staff_df[staff_df['날짜'] == today_str]
-            
-            if student_today.empty and staff_today.empty:
-                st.info("🏖️ 오늘은 식당을 운영하지 않습니다.")
-                return
-            
-            # 메뉴 표시
-            display_menu(student_today, staff_today, error)
-            
-            # AI 추천 섹션 (로그인한 경우에만)
-            if st.session_state.is_logged_in:
-                st.markdown("---")
-                st.subheader("🤖 AI 메뉴 추천")
-                
-                # 취향 설정 탭과 추천 결과 탭
-                tab1, tab2 = st.tabs(["취향 설정", "추천 결과"])
-                
-                with tab1:
-                    user_prefs = display_preference_settings()
-                
-                with tab2:
-                    st.info("🚀 AI 메뉴 추천 기능이 곧 제공될 예정입니다!")
-                    st.markdown("""
-                    ### Coming Soon!
-                    - 사용자 취향 기반 메뉴 추천
-                    - 알레르기 정보를 고려한 안전한 추천
-                    - 영양 균형을 고려한 식단 제안
-                    """)
-            else:
-                st.info("AI 메뉴 추천을 이용하시려면 로그인이 필요합니다.")
-            
-            # 리뷰 섹션
-            st.markdown("---")
-            st.subheader("🌟 리뷰")
-            
-            # 리뷰 목록 표시 (모든 사용자가 볼 수 있음)
-            display_reviews()
-            
-            # 리뷰 작성 UI (로그인한 사용자만)
-            if st.session_state.is_logged_in:
-                with st.expander("리뷰 작성하기"):
-                    rating = st.slider("별점", 1, 5, 3)
-                    review_text = st.text_area("리뷰 내용", placeholder="오늘의 학식은 어떠셨나요?")
-                    recommended = st.checkbox("오늘의 학식 추천")
-                    
-                    if st.button("리뷰 저장"):
-                        if review_text.strip():
-                            if save_review(
-                                st.session_state.username,
-                                rating,
-                                review_text,
-                                recommended
-                            ):
-                                st.success("리뷰가 저장되었습니다!")
-                                st.rerun()
-                        else:
-                            st.error("리뷰 내용을 입력해주세요.")
-            else:
-                st.info("리뷰 작성하려면 로그인이 필요합니다.")
-    else:
-        st.subheader("📅 이번 주 전체 메뉴")
-        student_df, staff_df, error = cached_get_weekly_menu()  # 캐시된 함수 사용
+            week = week_future.result()
         
-        if error:
-            st.error(error)
+        if week.error:
+            st.error(week.error)
         else:
-            # 메뉴 정렬 및 포맷팅
-            student_df, staff_df = align_menus_by_date(student_df, staff_df)
-            
             # 요일별로 메뉴 표시
-            display_weekly_menu(student_df, staff_df)
+            display_weekly_menu(week)
+    else:
+        st.subheader("📊 메뉴 통계")
+        display_dish_stats()
     
     # 새로고침 버튼
     if st.button("🔄 메뉴 새로고침"):
@@ -641,7 +807,7 @@ def main():
                         st.error("모든 필드를 입력해주세요.")
     
     # 메인 영역에 메뉴 표시
-    display_menu_section()
+    run_menu_section()
 
 # 비밀번호 해싱 함수
 def hash_password(password):
@@ -678,82 +844,33 @@ def display_reviews():
                 st.write(review['review_text'])
             st.divider()
 
-# 테이블 스타일 정의
-table_style = """
-<style>
-    .menu-table {
-        width: 100%;
-        border-collapse: collapse;
-        margin: 10px 0;
-        background-color: rgb(17, 17, 17);
-        color: rgb(238, 238, 238);
-    }
-    .menu-table th {
-        background-color: rgb(38, 39, 48);
-        color: rgb(238, 238, 238);
-        padding: 12px;
-        text-align: left;
-        border: 1px solid rgb(38, 39, 48);
-    }
-    .menu-table td {
-        padding: 12px;
-        border: 1px solid rgb(38, 39, 48);
-        background-color: rgb(17, 17, 17);
-    }
-    .menu-table tr:hover td {
-        background-color: rgb(38, 39, 48);
-    }
-    .section-title {
-        color: rgb(238, 238, 238);
-        margin: 20px 0 10px 0;
-        font-size: 1.2em;
-    }
-</style>
-"""
-
 def display_menu(student_menu, staff_menu, error_message):
-    """메뉴 표시"""
+    """메뉴 표시 (student_menu, staff_menu: menu_model.MenuItem 튜플)"""
     if error_message:
         st.error(error_message)
         return
 
     # 스타일 적용
-    st.markdown(table_style, unsafe_allow_html=True)
+    st.markdown(TABLE_STYLE, unsafe_allow_html=True)
     
     # 학생 식당 메뉴
     st.markdown("### 🍽️ 오늘의 학식 메뉴", unsafe_allow_html=True)
     
-    if not student_menu.empty:
+    if student_menu:
         st.markdown("#### 🎈 학생 식당", unsafe_allow_html=True)
         
-        # 데이터프레임을 HTML 테이블로 변환
-        html_table = "<table class='menu-table'>"
-        # 헤더 추가
-        html_table += "<tr><th>날짜</th><th>구분</th><th>메뉴</th></tr>"
-        
-        # 각 행 추가
-        for _, row in student_menu.iterrows():
-            html_table += f"<tr><td>{row['날짜']}</td><td>{row['구분']}</td><td>{row['메뉴']}</td></tr>"
-        
-        html_table += "</table>"
+        # 메뉴 항목을 HTML 테이블로 변환
+        html_table = menu_table_html((item.date_str, item.category, item.display) for item in student_menu)
         st.markdown(html_table, unsafe_allow_html=True)
     else:
         st.info("🍽️ AI 메뉴 추천을 이용하시려면 로그인이 필요합니다.")
     
     # 교직원 식당 메뉴
-    if not staff_menu.empty:
+    if staff_menu:
         st.markdown("#### 📍 교직원 식당", unsafe_allow_html=True)
         
-        # 데이터프레임을 HTML 테이블로 변환
-        html_table = "<table class='menu-table'>"
-        # 헤더 추가
-        html_table += "<tr><th>날짜</th><th>구분</th><th>메뉴</th></tr>"
-        
-        # 각 행 추가
-        for _, row in staff_menu.iterrows():
-            html_table += f"<tr><td>{row['날짜']}</td><td>{row['구분']}</td><td>{row['메뉴']}</td></tr>"
-        
-        html_table += "</table>"
+        # 메뉴 항목을 HTML 테이블로 변환
+        html_table = menu_table_html((item.date_str, item.category, item.display) for item in staff_menu)
         st.markdown(html_table, unsafe_allow_html=True)
     else:
         st.info("AI 메뉴 추천을 이용하시려면 로그인이 필요합니다.")
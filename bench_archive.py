@@ -0,0 +1,127 @@
+"""
+과거 메뉴 범위 조회 벤치마크: SQLite 행 조회 + pandas vs 열 기반 보관소(menu_archive)
+
+몇 년 치 메뉴를 만들어 "올해 학생식당 중식 - 일품 요리 전체" 같은 조회를 비교합니다.
+- sqlite : 기간 메뉴를 read_sql_query 로 읽고 요리 ID 단위로 나눠 이름을 붙인 뒤 필터
+- archive: 월별 Arrow 파일을 memory map 으로 읽고 사전 인코딩 열로 필터 (주간 크롤링처럼 주마다 파일 추가)
+- compact: 월별 파일을 하나로 합친 뒤 같은 조회
+
+실행: python bench_archive.py --years 3
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import pandas as pd
+import pyarrow as pa
+
+import dish_catalog
+import menu_archive
+import menu_store
+from fake_diet_site import STAFF_CATEGORIES, STUDENT_CATEGORIES, day_menu
+
+# parse_menu 가 저장하는 구분 이름
+CATEGORY_NAMES = {
+    "조식": "조식 (07:30 ~ 09:00)",
+    "중식 - 한식": "중식 - 한식 (11:30 ~ 13:30)",
+    "중식 - 일품": "중식 - 일품 (11:30 ~ 13:30)",
+    "중식 - 분식": "중식 - 분식 (11:30 ~ 13:30)",
+    "중식 - plus": "중식 - plus (11:30 ~ 13:30)",
+    "석식": "석식 (17:00 ~ 18:30)",
+    "중식": "중식",
+}
+
+QUERY_RESTAURANT = "학생식당"
+QUERY_CATEGORY = CATEGORY_NAMES["중식 - 일품"]
+
+def week_rows(monday):
+    """한 주(평일)의 크롤링 결과 행 (date, restaurant, category, menu 문자열, position)"""
+    rows = []
+    for offset in range(5):
+        day = monday + timedelta(days=offset)
+        for restaurant, categories in ((QUERY_RESTAURANT, STUDENT_CATEGORIES), ("교직원식당", STAFF_CATEGORIES)):
+            for position, category in enumerate(categories):
+                menu = menu_store.MENU_SEPARATOR.join(day_menu(day, category).split('*'))
+                rows.append((day.isoformat(), restaurant, CATEGORY_NAMES[category], menu, position))
+    return rows
+
+def build(work_dir, years, end):
+    """years 년 치 메뉴를 SQLite 와 보관소에 기록 (보관소는 주마다 파일 추가)"""
+    conn = menu_store.connect(os.path.join(work_dir, 'data.db'))
+    archive_dir = os.path.join(work_dir, 'menu_archive')
+    monday = menu_store.week_start(end - timedelta(days=365 * years))
+    weeks = 0
+    while monday <= end:
+        rows = week_rows(monday)
+        menu_store.save_rows(conn, monday, monday + timedelta(days=6), rows)
+        menu_archive.record_dates(conn, {row[0] for row in rows}, archive_dir)
+        monday += timedelta(days=7)
+        weeks += 1
+    return conn, archive_dir, weeks
+
+def query_sqlite(conn, start, end):
+    df = pd.read_sql_query("SELECT date, restaurant, category, dish_ids FROM menus WHERE date BETWEEN ? AND ?",
+                           conn, params=(start.isoformat(), end.isoformat()))
+    df = df[(df['restaurant'] == QUERY_RESTAURANT) & (df['category'] == QUERY_CATEGORY)]
+    df = df.assign(dish_id=df['dish_ids'].str.split(dish_catalog.ID_SEPARATOR, regex=False)).explode('dish_id')
+    names = dict(conn.execute("SELECT CAST(id AS TEXT), name FROM dishes"))
+    df = df.assign(dish=df['dish_id'].map(names))
+    return len(df)
+
+def query_archive(archive_dir, start, end):
+    return menu_archive.query(start, end, QUERY_RESTAURANT, QUERY_CATEGORY, out_dir=archive_dir).num_rows
+
+def measure(func, repeat):
+    """(결과, 중앙값 ms, 최대 할당 KiB) - 할당량은 Python 힙 + Arrow 메모리 풀"""
+    func()  # 준비 실행 (파일 캐시 등)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append((time.perf_counter() - start) * 1000)
+
+    arrow_before = pa.total_allocated_bytes()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    peak += max(pa.total_allocated_bytes() - arrow_before, 0)
+    return result, statistics.median(times), peak / 1024
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+def main():
+    parser = argparse.ArgumentParser(description="과거 메뉴 범위 조회 벤치마크")
+    parser.add_argument('--years', type=int, default=3, help="생성할 메뉴 기간 (년)")
+    parser.add_argument('--repeat', type=int, default=5, help="조회 반복 횟수")
+    args = parser.parse_args()
+
+    end = date(2024, 12, 31)
+    start = date(end.year, 1, 1)
+    work_dir = tempfile.mkdtemp(prefix='kus_archive_')
+    conn, archive_dir, weeks = build(work_dir, args.years, end)
+    print(f"{weeks}주 생성, SQLite {dir_size(work_dir) - dir_size(archive_dir):,} bytes, "
+          f"보관소 {dir_size(archive_dir):,} bytes")
+    print(f"조회: {start} ~ {end} {QUERY_RESTAURANT} {QUERY_CATEGORY}")
+
+    print(f"{'방식':<9}{'행':>7}{'중앙값':>12}{'최대 할당':>14}")
+    results = [('sqlite', lambda: query_sqlite(conn, start, end)),
+               ('archive', lambda: query_archive(archive_dir, start, end))]
+    for name, func in results:
+        rows, median_ms, peak_kib = measure(func, args.repeat)
+        print(f"{name:<9}{rows:>7}{median_ms:>10.1f}ms{peak_kib:>10.0f} KiB")
+
+    for month in os.listdir(archive_dir):
+        menu_archive.compact(month, archive_dir)
+    rows, median_ms, peak_kib = measure(lambda: query_archive(archive_dir, start, end), args.repeat)
+    print(f"{'compact':<9}{rows:>7}{median_ms:>10.1f}ms{peak_kib:>10.0f} KiB")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+앱 시작 시간 벤치마크 (예산을 넘으면 종료 코드 1)
+
+- import: 새 인터프리터에서 app.py 최상단 import 에 걸리는 시간 (streamlit 자체는 제외)
+- cold render: 새 프로세스의 첫 세션 첫 렌더링 (프로세스 초기화 포함)
+- session render: 이미 실행 중인 프로세스에서 새 세션의 첫 렌더링 (중앙값)
+
+식단 사이트는 fake_diet_site.py 대역 서버를 사용하므로 네트워크가 필요 없습니다.
+
+실행: python bench_startup.py --import-budget 0.3 --cold-budget 3.0 --session-budget 0.3
+"""
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(APP_DIR, 'app.py')
+
+def app_imports():
+    """app.py 최상단에서 import 하는 모듈 목록 (streamlit 제외)"""
+    with open(APP_PATH, encoding='utf-8-sig') as f:
+        tree = ast.parse(f.read())
+
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return [module for module in modules if module.split('.')[0] != 'streamlit']
+
+def measure_import():
+    """새 인터프리터에서 import 시간 측정 (초)"""
+    code = (
+        "import time, importlib, streamlit\n"
+        f"modules = {app_imports()!r}\n"
+        "start = time.perf_counter()\n"
+        "for module in modules:\n"
+        "    importlib.import_module(module)\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    output = subprocess.run([sys.executable, '-c', code], cwd=APP_DIR, check=True,
+                            capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+def render_once():
+    """새 세션으로 app.py 를 한 번 렌더링하고 걸린 시간 반환 (초)"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    if at.error:
+        raise RuntimeError(at.error[0].value)
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="KUS Meals 시작 시간 벤치마크")
+    parser.add_argument('--import-budget', type=float, default=0.3, help="import 시간 예산 (초)")
+    parser.add_argument('--cold-budget', type=float, default=3.0, help="첫 렌더링 시간 예산 (초)")
+    parser.add_argument('--session-budget', type=float, default=0.3, help="새 세션 렌더링 시간 예산 (초)")
+    parser.add_argument('--sessions', type=int, default=5, help="새 세션 렌더링 반복 횟수")
+    args = parser.parse_args()
+
+    # 격리된 데이터베이스/스냅샷 경로와 식단 사이트 대역 서버 사용
+    work_dir = tempfile.mkdtemp(prefix='kus_bench_')
+    os.environ['KUS_DB_PATH'] = os.path.join(work_dir, 'data.db')
+    os.environ['KUS_SNAPSHOT_DIR'] = os.path.join(work_dir, 'snapshots')
+    sys.path.insert(0, APP_DIR)
+
+    import fake_diet_site
+    site = fake_diet_site.make_server()
+    threading.Thread(target=site.serve_forever, daemon=True).start()
+    os.environ['KUS_DIET_BASE_URL'] = f"http://127.0.0.1:{site.server_address[1]}"
+
+    results = [
+        ("import", measure_import(), args.import_budget),
+        ("cold render", render_once(), args.cold_budget),
+        ("session render", statistics.median(render_once() for _ in range(args.sessions)),
+         args.session_budget),
+    ]
+
+    failed = False
+    for name, elapsed, budget in results:
+        ok = elapsed <= budget
+        failed = failed or not ok
+        print(f"{name:<15} {elapsed * 1000:8.1f} ms  (예산 {budget * 1000:.0f} ms) {'OK' if ok else '초과'}")
+
+    site.shutdown()
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
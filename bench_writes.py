@@ -0,0 +1,114 @@
+"""
+리뷰 쓰기 폭주 벤치마크: 세션별 직접 커밋 vs 쓰기 큐(그룹 커밋)
+
+점심 직후처럼 여러 세션이 동시에 리뷰를 저장하는 상황을 스레드로 재현합니다.
+- direct: 기존 방식 (세션마다 자기 연결에서 DELETE + INSERT 후 commit)
+- queue : db_writer.WriteQueue 로 제출하고 커밋 완료까지 대기
+
+실행: python bench_writes.py --threads 50 --writes 20
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import db_writer
+
+REVIEW_STATEMENTS = [
+    "DELETE FROM reviews WHERE date = ? AND username = ?",
+    """INSERT INTO reviews (date, username, rating, review_text, recommended)
+       VALUES (?, ?, ?, ?, ?)""",
+]
+
+def review_statements(username, index):
+    today_date = "2024-03-04"
+    return [
+        (REVIEW_STATEMENTS[0], (today_date, username)),
+        (REVIEW_STATEMENTS[1], (today_date, username, index % 5 + 1, f"리뷰 {index}", index % 2 == 0)),
+    ]
+
+def create_db():
+    db_path = os.path.join(tempfile.mkdtemp(prefix='kus_writes_'), 'data.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute('''CREATE TABLE reviews
+                    (date TEXT, username TEXT, rating INTEGER,
+                     review_text TEXT, recommended BOOLEAN)''')
+    conn.commit()
+    conn.close()
+    return db_path
+
+def direct_writer(db_path):
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+
+    def write(statements):
+        c = conn.cursor()
+        for sql, params in statements:
+            c.execute(sql, params)
+        conn.commit()
+
+    return write, conn.close
+
+def run_burst(mode, threads, writes):
+    db_path = create_db()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    write_queue = db_writer.WriteQueue(db_path) if mode == 'queue' else None
+    barrier = threading.Barrier(threads)
+
+    def worker(worker_id):
+        if write_queue is not None:
+            write, close = write_queue.execute, lambda: None
+        else:
+            write, close = direct_writer(db_path)
+        barrier.wait()
+        for i in range(writes):
+            start = time.perf_counter()
+            try:
+                write(review_statements(f"user{worker_id}", i))
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+        close()
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    if write_queue is not None:
+        write_queue.close()
+
+    conn = sqlite3.connect(db_path)
+    stored = conn.execute("SELECT COUNT(*) FROM reviews").fetchone()[0]
+    conn.close()
+    return elapsed, sorted(latencies), errors, stored
+
+def main():
+    parser = argparse.ArgumentParser(description="리뷰 쓰기 폭주 벤치마크")
+    parser.add_argument('--threads', type=int, default=50, help="동시에 쓰는 세션 수")
+    parser.add_argument('--writes', type=int, default=20, help="세션당 쓰기 횟수")
+    args = parser.parse_args()
+
+    print(f"{'방식':<8}{'처리량':>12}{'p50':>10}{'p95':>10}{'max':>10}{'실패':>6}{'저장':>6}")
+    for mode in ('direct', 'queue'):
+        elapsed, latencies, errors, stored = run_burst(mode, args.threads, args.writes)
+        completed = len(latencies)
+
+        def pct(p):
+            return latencies[min(completed - 1, int(p / 100 * completed))] * 1000 if completed else 0
+
+        print(f"{mode:<8}{completed / elapsed:>9.0f}/s{pct(50):>8.1f}ms{pct(95):>8.1f}ms"
+              f"{(latencies[-1] * 1000 if completed else 0):>8.1f}ms{len(errors):>6}{stored:>6}")
+        for message in sorted(set(errors))[:3]:
+            print(f"  {mode} 실패: {message}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+식단 페이지 원본 HTML 보관소 (기록/재생)
+
+KUS_CRAWL_MODE 환경 변수로 crawling.py 의 동작을 바꿉니다.
+- record : 식단 사이트에서 가져오면서 받은 페이지를 보관소에 저장 (기본값)
+- live   : 식단 사이트에서 가져오기만 하고 보관하지 않음
+- replay : 네트워크 없이 보관소에 저장된 페이지만 사용 (앱 전체를 오프라인으로 재현)
+
+crawl_archive/
+    index.jsonl                  날짜별 수집 기록 (한 줄에 한 번의 수집, 마지막 줄이 최신)
+    blobs/ab/<sha256>.html.gz    원본 HTML (내용 해시 이름, 같은 페이지는 한 번만 저장)
+
+parse_menu 를 고친 뒤에는 `python crawl_archive.py reparse` 로 보관된 페이지를 다시 파싱해서
+저장된 메뉴를 갱신할 수 있습니다.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import date
+
+ARCHIVE_DIR = os.environ.get('KUS_CRAWL_ARCHIVE', 'crawl_archive')
+INDEX_NAME = 'index.jsonl'
+
+LIVE = 'live'
+RECORD = 'record'
+REPLAY = 'replay'
+CRAWL_MODES = (LIVE, RECORD, REPLAY)
+
+# 보관소에서 읽은 페이지 (crawling.py 에서 requests 응답 대신 사용)
+ArchivedResponse = namedtuple('ArchivedResponse', ['status_code', 'text'])
+
+class PageNotArchived(LookupError):
+    """보관소에 해당 날짜 페이지가 없음 (재생 모드에서 메뉴 없는 날로 취급하지 않도록 예외로 알림)"""
+
+_index_cache = {}
+_index_lock = threading.Lock()
+
+# 기본 모드: 실제로 크롤링한 페이지는 항상 보관 (parse_menu 를 고친 뒤 reparse 로 다시 반영할 수 있도록)
+DEFAULT_CRAWL_MODE = RECORD
+
+def crawl_mode():
+    """현재 크롤링 모드 (설정하지 않았거나 알 수 없는 값이면 DEFAULT_CRAWL_MODE)"""
+    mode = os.environ.get('KUS_CRAWL_MODE', DEFAULT_CRAWL_MODE).lower()
+    return mode if mode in CRAWL_MODES else DEFAULT_CRAWL_MODE
+
+def _blob_path(out_dir, digest):
+    return os.path.join(out_dir, 'blobs', digest[:2], f"{digest}.html.gz")
+
+def save_page(day, url, content, encoding=None, out_dir=None):
+    """
+    받은 페이지 원본(bytes)을 보관하고 날짜(date/datetime) 색인에 기록
+    반환값: 내용 해시 (sha256)
+    """
+    out_dir = out_dir or ARCHIVE_DIR
+    digest = hashlib.sha256(content).hexdigest()
+    path = _blob_path(out_dir, digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(gzip.compress(content, mtime=0))  # 같은 내용이면 같은 파일
+        os.replace(tmp_path, path)
+
+    entry = {
+        'date': day.strftime("%Y-%m-%d"),
+        'url': url,
+        'sha256': digest,
+        'encoding': encoding,
+        'fetched_at': time.time(),
+    }
+    # 한 줄을 한 번에 append 하므로 여러 프로세스가 동시에 기록해도 줄이 섞이지 않음
+    with open(os.path.join(out_dir, INDEX_NAME), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    return digest
+
+def read_index(out_dir=None):
+    """날짜(YYYY-MM-DD)별 최신 수집 기록 (파일이 바뀌었을 때만 다시 읽음)"""
+    path = os.path.join(out_dir or ARCHIVE_DIR, INDEX_NAME)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return {}
+
+    with _index_lock:
+        cached = _index_cache.get(path)
+        if cached and cached[0] == (stat.st_mtime_ns, stat.st_size):
+            return cached[1]
+
+        index = {}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # 기록 중인 마지막 줄
+                index[entry['date']] = entry
+        _index_cache[path] = ((stat.st_mtime_ns, stat.st_size), index)
+        return index
+
+def load_page(day, out_dir=None):
+    """보관된 날짜 페이지 (없으면 PageNotArchived)"""
+    out_dir = out_dir or ARCHIVE_DIR
+    entry = read_index(out_dir).get(day.strftime("%Y-%m-%d"))
+    if entry is None:
+        raise PageNotArchived(f"보관된 페이지가 없습니다: {day.strftime('%Y-%m-%d')}")
+
+    with open(_blob_path(out_dir, entry['sha256']), 'rb') as f:
+        content = gzip.decompress(f.read())
+    return ArchivedResponse(200, content.decode(entry.get('encoding') or 'utf-8', errors='replace'))
+
+def archived_dates(start=None, end=None, out_dir=None):
+    """보관된 날짜 목록 (date, 오름차순)"""
+    days = sorted(date.fromisoformat(day) for day in read_index(out_dir))
+    return [day for day in days
+            if (start is None or day >= start) and (end is None or day <= end)]
+
+def reparse(conn, start=None, end=None, out_dir=None):
+    """
+    보관된 페이지를 현재 parse_menu 로 다시 파싱해서 저장된 메뉴 갱신 (바뀐 항목만 기록)
+    반환값: 날짜별 변경 수 {date: count}
+    """
+    from bs4 import BeautifulSoup
+
+    import menu_store
+    from crawling import parse_menu
+
+    counts = {}
+    for day in archived_dates(start, end, out_dir):
+        response = load_page(day, out_dir)
+        soup = BeautifulSoup(response.text, 'html.parser')
+        student_df = parse_menu(soup, day, "학생식당")
+        staff_df = parse_menu(soup, day, "교직원식당")
+        rows = menu_store.menu_rows(menu_store.week_start(day), student_df, staff_df)
+        changes = menu_store.save_rows(conn, day, day, rows)
+        menu_store.publish_changes(conn, day, changes)
+        counts[day.isoformat()] = len(changes)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="식단 페이지 보관소")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = subparsers.add_parser('list', help="보관된 날짜 목록")
+    reparse_parser = subparsers.add_parser('reparse', help="보관된 페이지를 다시 파싱해서 메뉴 갱신")
+    for sub in (list_parser, reparse_parser):
+        sub.add_argument('--archive', default=ARCHIVE_DIR, help="보관소 디렉터리")
+        sub.add_argument('--start', type=date.fromisoformat, help="시작 날짜 (YYYY-MM-DD)")
+        sub.add_argument('--end', type=date.fromisoformat, help="끝 날짜 (YYYY-MM-DD)")
+    reparse_parser.add_argument('--db', default=None, help="데이터베이스 경로")
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        index = read_index(args.archive)
+        for day in archived_dates(args.start, args.end, args.archive):
+            entry = index[day.isoformat()]
+            print(f"{day.isoformat()}  {entry['sha256'][:12]}  {entry['url']}")
+        return
+
+    import menu_store
+
+    conn = menu_store.connect(args.db)
+    counts = reparse(conn, args.start, args.end, args.archive)
+    print(f"다시 파싱한 날짜: {len(counts)}, 변경된 메뉴: {sum(counts.values())}")
+    for day, count in counts.items():
+        if count:
+            print(f"  {day}: {count}건")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
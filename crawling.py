@@ -1,140 +1,153 @@
+"""
+식단 페이지 크롤링
+
+Streamlit 세션 상태와 무관하게 날짜/기간을 직접 받아 크롤링하므로 워커 프로세스, 스레드 풀, CLI 에서도 사용할 수 있습니다.
+- fetch_day / fetch_range : 날짜별 결과(DayMenu) 반환
+- get_today_menu / get_weekly_menu / get_day_menu : 기존 (학생식당, 교직원식당, 오류) 형식으로 합쳐 주는 함수
+
+실행: python crawling.py 2024-03-04 2024-03-08 --workers 5
+"""
+import argparse
+import os
+import time
 import requests
 from bs4 import BeautifulSoup
 import pandas as pd
-from datetime import datetime, timedelta
-import pytz
-from utils import get_current_date
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+import crawl_archive
+
+# 식단 사이트 주소 (환경 변수로 로컬 대역 서버 지정 가능, fake_diet_site.py 참고)
+DIET_BASE_URL = os.environ.get('KUS_DIET_BASE_URL', 'https://sejong.korea.ac.kr').rstrip('/')
+
+# 식단 페이지 요청 제한 시간 (초) - 크롤링 임대 시간(menu_store.CRAWL_LEASE_TTL) 안에 끝나도록 제한
+REQUEST_TIMEOUT = 20
+
+# 메인 페이지를 거쳐 요청할 때 사용하는 브라우저 헤더
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+    'Accept-Language': 'ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Connection': 'keep-alive',
+    'Referer': 'https://sejong.korea.ac.kr/',
+}
+
+MENU_COLUMNS = ['날짜', '구분', '메뉴']
+
+# date: 날짜, status: HTTP 상태 코드 (요청 자체가 실패하면 None),
+# student/staff: parse_menu 데이터프레임, error: 오류 메시지 (성공하면 None)
+DayMenu = namedtuple('DayMenu', ['date', 'status', 'student', 'staff', 'error'])
 
-def get_today_menu():
-    """오늘의 메뉴를 크롤링"""
+def _empty_menu():
+    return pd.DataFrame(columns=MENU_COLUMNS)
+
+def _to_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+def diet_page_url(date):
+    """날짜 식단 페이지 URL"""
+    temp_date = date.strftime("%Y%m%d")
+    search_day = date.strftime("%Y.%m.%d")
+    return f"{DIET_BASE_URL}/dietMa/koreaSejong/artclView.do?siteId=koreaSejong&tempDate={temp_date}&day30=&searchDay={search_day}"
+
+def fetch_diet_page(date, session=None, headers=None):
+    """
+    날짜 식단 페이지 요청 (status_code, text 가 있는 응답 반환)
+    기본(record)으로 받은 페이지를 보관하고, KUS_CRAWL_MODE=live 이면 보관하지 않으며,
+    replay 이면 네트워크 없이 보관된 페이지 사용
+    """
+    mode = crawl_archive.crawl_mode()
+    if mode == crawl_archive.REPLAY:
+        return crawl_archive.load_page(date)
+    
+    url = diet_page_url(date)
+    response = (session or requests).get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    if mode == crawl_archive.RECORD and response.status_code == 200:
+        try:
+            crawl_archive.save_page(date, url, response.content, response.encoding or response.apparent_encoding)
+        except OSError:
+            pass  # 보관 실패 (디스크 공간, 권한 등) 는 크롤링 결과에 영향 없음
+    return response
+
+def open_session():
+    """메인 페이지를 먼저 방문한 requests 세션 (보관소 재생 시에는 방문 생략)"""
+    session = requests.Session()
     try:
-        # 선택된 날짜 사용
-        current_date = get_current_date()
-        
-        # URL 파라미터 생성
-        temp_date = current_date.strftime("%Y%m%d")
-        search_day = current_date.strftime("%Y.%m.%d")
-        
-        # 식단 페이지 URL
-        url = f"https://sejong.korea.ac.kr/dietMa/koreaSejong/artclView.do?siteId=koreaSejong&tempDate={temp_date}&day30=&searchDay={search_day}"
-        
-        # 헤더 설정
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-            'Accept-Language': 'ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Connection': 'keep-alive',
-            'Referer': 'https://sejong.korea.ac.kr/',
-        }
-        
-        # 세션 생성
-        with requests.Session() as session:
-            # 메인 페이지 먼저 방문
-            session.get('https://sejong.korea.ac.kr/', headers=headers)
-            
-            # 식단 페이지 요청
-            response = session.get(url, headers=headers)
-            
-            if response.status_code != 200:
-                return pd.DataFrame(columns=['날짜', '구분', '메뉴']), pd.DataFrame(columns=['날짜', '구분', '메뉴']), f"메뉴 페이지 접속 실패: {response.status_code}"
-            
-            # HTML 파싱
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 학생식당과 교직원식당 메뉴 파싱
-            student_menu = parse_menu(soup, current_date, "학생식당")
-            staff_menu = parse_menu(soup, current_date, "교직원식당")
-            
-            # 메뉴가 없는 경우 해당 주의 메뉴를 가져옴
-            if student_menu.empty and staff_menu.empty:
-                # 해당 주의 월요일 찾기
-                monday = current_date - timedelta(days=current_date.weekday())
-                
-                student_menus = []
-                staff_menus = []
-                
-                # 월요일부터 금요일까지의 메뉴 크롤링
-                for i in range(5):  # 0=월요일, 4=금요일
-                    date = monday + timedelta(days=i)
-                    
-                    # URL 파라미터 생성
-                    temp_date = date.strftime("%Y%m%d")
-                    search_day = date.strftime("%Y.%m.%d")
-                    
-                    # 식단 페이지 URL
-                    url = f"https://sejong.korea.ac.kr/dietMa/koreaSejong/artclView.do?siteId=koreaSejong&tempDate={temp_date}&day30=&searchDay={search_day}"
-                    
-                    # 페이지 크롤링
-                    response = session.get(url, headers=headers)
-                    
-                    if response.status_code == 200:
-                        soup = BeautifulSoup(response.text, 'html.parser')
-                        
-                        # 학생식당과 교직원식당 메뉴 파싱
-                        student_menu = parse_menu(soup, date, "학생식당")
-                        staff_menu = parse_menu(soup, date, "교직원식당")
-                        
-                        if not student_menu.empty:
-                            student_menus.append(student_menu)
-                        if not staff_menu.empty:
-                            staff_menus.append(staff_menu)
-                
-                # 메뉴 데이터 합치기
-                student_menu = pd.concat(student_menus, ignore_index=True) if student_menus else pd.DataFrame(columns=['날짜', '구분', '메뉴'])
-                staff_menu = pd.concat(staff_menus, ignore_index=True) if staff_menus else pd.DataFrame(columns=['날짜', '구분', '메뉴'])
-            
-            return student_menu, staff_menu, None
-            
+        session.headers.update(BROWSER_HEADERS)
+        if crawl_archive.crawl_mode() != crawl_archive.REPLAY:
+            session.get(f'{DIET_BASE_URL}/', timeout=REQUEST_TIMEOUT)
+    except BaseException:
+        session.close()  # 메인 페이지 방문에 실패하면 연결 풀을 남기지 않음
+        raise
+    return session
+
+def fetch_day(day, session=None, headers=None):
+    """하루 식단 페이지를 요청해서 파싱 (예외 대신 DayMenu.error 로 실패 반환)"""
+    try:
+        response = fetch_diet_page(day, session, headers)
     except Exception as e:
-        import traceback
-        return pd.DataFrame(columns=['날짜', '구분', '메뉴']), pd.DataFrame(columns=['날짜', '구분', '메뉴']), f"메뉴를 가져오는 중 오류가 발생했습니다: {str(e)}"
+        return DayMenu(day, None, _empty_menu(), _empty_menu(), f"메뉴를 가져오는 중 오류가 발생했습니다: {str(e)}")
+    
+    if response.status_code != 200:
+        return DayMenu(day, response.status_code, _empty_menu(), _empty_menu(),
+                       f"메뉴 페이지 접속 실패: {response.status_code}")
+    
+    soup = BeautifulSoup(response.text, 'html.parser')
+    return DayMenu(day, response.status_code, parse_menu(soup, day, "학생식당"), parse_menu(soup, day, "교직원식당"), None)
 
-def get_weekly_menu():
-    """이번 주 전체 메뉴를 크롤링"""
+def fetch_range(start, end, session=None, headers=None, max_workers=1, weekends=False):
+    """
+    기간(start ~ end) 식단 페이지를 날짜마다 요청해서 DayMenu 목록으로 반환 (날짜 순)
+    max_workers 가 2 이상이면 페이지를 동시에 요청, weekends=False 이면 토/일요일 제외
+    """
+    start, end = _to_date(start), _to_date(end)
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    if not weekends:
+        days = [day for day in days if day.weekday() < 5]
+    
+    if max_workers <= 1 or len(days) <= 1:
+        return [fetch_day(day, session, headers) for day in days]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(days)), thread_name_prefix="kus-crawl") as executor:
+        return list(executor.map(lambda day: fetch_day(day, session, headers), days))
+
+def merge_days(days):
+    """DayMenu 목록을 (학생식당, 교직원식당, 오류) 로 합침 (요청 자체가 실패한 날이 있으면 오류)"""
+    for day in days:
+        if day.status is None:
+            return _empty_menu(), _empty_menu(), day.error
+    
+    student_menus = [day.student for day in days if not day.student.empty]
+    staff_menus = [day.staff for day in days if not day.staff.empty]
+    student_df = pd.concat(student_menus, ignore_index=True) if student_menus else _empty_menu()
+    staff_df = pd.concat(staff_menus, ignore_index=True) if staff_menus else _empty_menu()
+    return student_df, staff_df, None
+
+def get_today_menu(target_date):
+    """하루 메뉴를 크롤링 (그날 메뉴가 없으면 해당 주 월~금 메뉴)"""
     try:
-        # 선택된 날짜 사용
-        current_date = get_current_date()
-        
-        # 해당 주의 월요일 찾기
-        monday = current_date - timedelta(days=current_date.weekday())
-        
-        student_menus = []
-        staff_menus = []
-        
-        # 월요일부터 금요일까지의 메뉴 크롤링
-        for i in range(5):  # 0=월요일, 4=금요일
-            date = monday + timedelta(days=i)
-            
-            # URL 파라미터 생성
-            temp_date = date.strftime("%Y%m%d")
-            search_day = date.strftime("%Y.%m.%d")
+        with open_session() as session:
+            today = fetch_day(_to_date(target_date), session)
+            if today.error:
+                return today.student, today.staff, today.error
+            if not (today.student.empty and today.staff.empty):
+                return today.student, today.staff, None
             
-            # 식단 페이지 URL
-            url = f"https://sejong.korea.ac.kr/dietMa/koreaSejong/artclView.do?siteId=koreaSejong&tempDate={temp_date}&day30=&searchDay={search_day}"
-            
-            # 페이지 크롤링
-            response = requests.get(url)
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # 학생식당과 교직원식당 메뉴 파싱
-                student_menu = parse_menu(soup, date, "학생식당")
-                staff_menu = parse_menu(soup, date, "교직원식당")
-                
-                if not student_menu.empty:
-                    student_menus.append(student_menu)
-                if not staff_menu.empty:
-                    staff_menus.append(staff_menu)
-        
-        # 메뉴 데이터 합치기
-        student_df = pd.concat(student_menus, ignore_index=True) if student_menus else pd.DataFrame(columns=['날짜', '구분', '메뉴'])
-        staff_df = pd.concat(staff_menus, ignore_index=True) if staff_menus else pd.DataFrame(columns=['날짜', '구분', '메뉴'])
-        
-        return student_df, staff_df, None
-        
+            monday = today.date - timedelta(days=today.date.weekday())
+            return merge_days(fetch_range(monday, monday + timedelta(days=4), session))
     except Exception as e:
-        return pd.DataFrame(columns=['날짜', '구분', '메뉴']), pd.DataFrame(columns=['날짜', '구분', '메뉴']), f"메뉴를 가져오는 중 오류가 발생했습니다: {str(e)}"
+        return _empty_menu(), _empty_menu(), f"메뉴를 가져오는 중 오류가 발생했습니다: {str(e)}"
+
+def get_weekly_menu(target_date, max_workers=1):
+    """해당 주 월~금 메뉴를 크롤링 (페이지 접속에 실패한 날은 건너뜀, 저장할 때는 fetch_range 로 날짜별 결과 사용)"""
+    target_date = _to_date(target_date)
+    monday = target_date - timedelta(days=target_date.weekday())
+    return merge_days(fetch_range(monday, monday + timedelta(days=4), max_workers=max_workers))
+
+def get_day_menu(target_date):
+    """하루 메뉴만 크롤링 (해당 날짜 페이지 한 번만 요청)"""
+    day = fetch_day(target_date)
+    return day.student, day.staff, day.error
 
 def parse_menu(soup, date, menu_type):
     """메뉴 HTML 파싱"""
@@ -210,10 +223,12 @@ def parse_menu(soup, date, menu_type):
             menu_text = menu_cell.get_text(strip=True)
             
             if menu_text and menu_text != "-" and not "식당을 운영하지 않습니다" in menu_text:
-                # 쌀밥/백미밥으로 시작하는 경우 처리
-                if menu_text.startswith("쌀밥") or menu_text.startswith("백미밥"):
-                    menu_items.append("쌀밥")
-                    menu_text = menu_text[2:] if menu_text.startswith("쌀밥") else menu_text[3:]
+                # 쌀밥/백미밥이 다음 요리와 붙어 있는 경우 분리 (같은 요리로 묶는 것은 dish_catalog 동의어)
+                for rice in ("쌀밥", "백미밥"):
+                    if menu_text.startswith(rice):
+                        menu_items.append(rice)
+                        menu_text = menu_text[len(rice):]
+                        break
                 
                 # 메뉴 항목 분리 (메뉴 구분자로 사용되는 문자들 처리)
                 items = []
@@ -255,4 +270,41 @@ def parse_menu(soup, date, menu_type):
         return df
         
     except Exception as e:
-        return pd.DataFrame(columns=['날짜', '구분', '메뉴']) 
\ No newline at end of file
+        return pd.DataFrame(columns=['날짜', '구분', '메뉴'])
+
+def _split_range(start, end, parts):
+    """기간을 parts 개의 연속된 기간으로 나눔"""
+    total = (end - start).days + 1
+    size = -(-total // parts)
+    return [(start + timedelta(days=i), min(start + timedelta(days=i + size - 1), end))
+            for i in range(0, total, size)]
+
+def main():
+    parser = argparse.ArgumentParser(description="식단 페이지 크롤링 (Streamlit 없이 실행)")
+    parser.add_argument('start', type=date.fromisoformat, help="시작 날짜 (YYYY-MM-DD)")
+    parser.add_argument('end', type=date.fromisoformat, nargs='?', help="끝 날짜 (생략 시 시작 날짜)")
+    parser.add_argument('--workers', type=int, default=1, help="프로세스마다 동시에 요청할 페이지 수")
+    parser.add_argument('--processes', type=int, default=1, help="기간을 나눠 크롤링할 프로세스 수")
+    parser.add_argument('--weekends', action='store_true', help="토/일요일 포함")
+    args = parser.parse_args()
+    end = args.end or args.start
+
+    started = time.perf_counter()
+    if args.processes > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(args.processes) as executor:
+            futures = [executor.submit(fetch_range, chunk_start, chunk_end, None, None, args.workers, args.weekends)
+                       for chunk_start, chunk_end in _split_range(args.start, end, args.processes)]
+            days = [day for future in futures for day in future.result()]
+    else:
+        days = fetch_range(args.start, end, max_workers=args.workers, weekends=args.weekends)
+    elapsed = time.perf_counter() - started
+
+    for day in days:
+        print(f"{day.date} {day.status}: 학생식당 {len(day.student)}개, 교직원식당 {len(day.staff)}개"
+              + (f" ({day.error})" if day.error else ""))
+    print(f"{len(days)}일, {elapsed:.2f}초")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+리뷰/선호도 쓰기 큐 (그룹 커밋)
+
+모든 세션의 쓰기를 하나의 백그라운드 작성자가 받아 작은 배치 트랜잭션으로 커밋합니다.
+- 호출자는 submit() 이 돌려준 Future 로 완료를 기다리며, Future 는 COMMIT 이 끝난 뒤에만 완료됩니다.
+- 작업마다 SAVEPOINT 를 사용하므로 한 작업이 실패해도 같은 배치의 다른 작업은 커밋됩니다.
+- 응답 지연: 앞 배치가 끝나기를 기다리는 시간 + MAX_BATCH_DELAY + 배치 실행 시간
+  (다른 연결이 쓰기 잠금을 잡고 있으면 그만큼 더 걸리며, 호출자는 ACK_TIMEOUT 까지만 대기)
+- 작업 중 어떤 예외가 나도 해당 Future 만 실패시키고 작성자는 계속 동작합니다.
+- 연결을 열 수 없으면 (잠금, 권한, 디스크 오류 등) 몇 번 다시 시도한 뒤 대기 중인 작업을 바로 실패시키고,
+  다음 작업이 들어오면 다시 연결을 시도합니다.
+- after_commit(conn) 은 커밋 후 별도 스레드에서 별도 연결로 호출합니다 (파생 데이터 갱신용).
+  after_commit_interval 동안 들어온 커밋은 모아서 한 번만 호출하므로, 작성자 스레드는 갱신을 기다리지 않고
+  갱신이 쓰기 잠금을 잡는 것도 간격당 한 번뿐입니다.
+
+대기 시간 초과: 작성자가 아직 꺼내지 않은 작업은 취소되어 기록되지 않지만, 이미 배치에 들어간 작업은
+호출자가 포기한 뒤에도 커밋될 수 있습니다. 그래서 큐에 넣는 작업은 여러 번 실행해도 결과가 같도록
+작성합니다 (예: DELETE 후 INSERT, INSERT OR REPLACE). 이런 작업은 시간 초과 후 다시 시도해도 안전합니다.
+"""
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+# 배치를 모으는 최대 시간 (초) 과 최대 작업 수
+MAX_BATCH_DELAY = 0.01
+MAX_BATCH_SIZE = 64
+
+# 호출자가 커밋 완료를 기다리는 최대 시간 (초)
+ACK_TIMEOUT = 10
+
+# after_commit 호출 최소 간격 (초)
+AFTER_COMMIT_INTERVAL = 1.0
+
+# 작성자 연결 생성 재시도 횟수와 간격 (초, 시도할 때마다 늘어남)
+CONNECT_RETRIES = 3
+CONNECT_RETRY_DELAY = 0.1
+
+_STOP = object()
+
+class WriteQueue:
+    """단일 백그라운드 작성자 (프로세스당 하나)"""
+
+    def __init__(self, db_path, max_batch_size=MAX_BATCH_SIZE, max_batch_delay=MAX_BATCH_DELAY,
+                 after_commit=None, after_commit_interval=AFTER_COMMIT_INTERVAL):
+        self.db_path = db_path
+        self.max_batch_size = max_batch_size
+        self.max_batch_delay = max_batch_delay
+        self.after_commit = after_commit
+        self.after_commit_interval = after_commit_interval
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="kus-db-writer", daemon=True)
+        self._thread.start()
+
+        self._after_cond = threading.Condition()
+        self._after_pending = False
+        self._closing = False
+        self._after_thread = None
+        if after_commit is not None:
+            self._after_thread = threading.Thread(target=self._run_after_commit, name="kus-db-after-commit",
+                                                  daemon=True)
+            self._after_thread.start()
+
+    def submit(self, statements):
+        """
+        [(sql, params), ...] 를 하나의 원자적 작업으로 등록
+        반환값: 커밋되면 None 으로, 실패하면 예외로 완료되는 Future
+        """
+        future = Future()
+        self._queue.put((list(statements), future))
+        return future
+
+    def execute(self, statements, timeout=ACK_TIMEOUT):
+        """
+        작업을 등록하고 커밋될 때까지 대기
+        시간 초과 시 TimeoutError (아직 시작되지 않은 작업은 취소, 이미 배치에 들어갔으면 커밋될 수 있음)
+        """
+        future = self.submit(statements)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            if future.cancel():
+                raise TimeoutError("쓰기 대기 시간이 초과되어 저장하지 않았습니다.") from None
+            raise TimeoutError("쓰기 대기 시간이 초과되었습니다. (저장 여부를 확인할 수 없음)") from None
+
+    def close(self):
+        """남은 작업을 모두 커밋하고 밀린 after_commit 을 실행한 뒤 종료"""
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self._after_thread is not None:
+            with self._after_cond:
+                self._closing = True
+                self._after_cond.notify()
+            self._after_thread.join()
+
+    def _collect(self, first):
+        """첫 작업 이후 max_batch_delay 동안 들어온 작업을 모아 배치 생성"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_batch_delay
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _drain(self):
+        """큐에 남은 작업을 모두 꺼냄 (종료 요청은 다시 넣어 둠)"""
+        items = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return items
+            if item is _STOP:
+                self._queue.put(_STOP)
+                return items
+            items.append(item)
+
+    def _connect(self):
+        """작성자 연결 생성 (실패하면 CONNECT_RETRIES 번까지 다시 시도한 뒤 마지막 예외를 냄)"""
+        for attempt in range(CONNECT_RETRIES):
+            conn = None
+            try:
+                conn = sqlite3.connect(self.db_path, timeout=ACK_TIMEOUT, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")  # 쓰는 동안에도 다른 세션의 읽기 허용
+                conn.execute("PRAGMA synchronous=FULL")  # 커밋 완료 = 디스크 기록 완료
+                return conn
+            except sqlite3.Error:
+                if conn is not None:
+                    conn.close()
+                if attempt == CONNECT_RETRIES - 1:
+                    raise
+                time.sleep(CONNECT_RETRY_DELAY * (attempt + 1))
+
+    def _run(self):
+        try:
+            conn = self._connect()
+        except Exception:
+            conn = None  # 첫 작업이 들어올 때 다시 시도
+
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch = self._collect(first)
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception as e:
+                    # 호출자가 ACK_TIMEOUT 까지 기다리지 않도록 대기 중인 작업을 모두 바로 실패시킴
+                    for _, future in batch + self._drain():
+                        if future.set_running_or_notify_cancel():
+                            future.set_exception(e)
+                    continue
+            if self._commit(conn, batch) and self.after_commit is not None:
+                with self._after_cond:
+                    self._after_pending = True
+                    self._after_cond.notify()
+
+        if conn is not None:
+            conn.close()
+
+    def _run_after_commit(self):
+        """커밋 알림을 모아 after_commit_interval 에 한 번씩 after_commit 실행"""
+        conn = None
+        next_run = 0.0
+        while True:
+            with self._after_cond:
+                while not self._after_pending and not self._closing:
+                    self._after_cond.wait()
+                if not self._after_pending:
+                    break
+                # 간격이 지나기 전에 들어온 커밋은 이번 호출에 합침 (종료 중이면 바로 실행)
+                while not self._closing and time.monotonic() < next_run:
+                    self._after_cond.wait(next_run - time.monotonic())
+                self._after_pending = False
+
+            next_run = time.monotonic() + self.after_commit_interval
+            try:
+                if conn is None:
+                    conn = sqlite3.connect(self.db_path, timeout=ACK_TIMEOUT, isolation_level=None)
+                self.after_commit(conn)
+            except Exception:
+                pass  # 파생 데이터 갱신 실패는 쓰기 결과와 무관 (다음 커밋 후 다시 시도)
+
+        if conn is not None:
+            conn.close()
+
+    def _commit(self, conn, batch):
+        """배치 커밋 (커밋된 작업이 하나라도 있으면 True)"""
+        # 호출자가 이미 취소한 작업은 제외 (시작된 작업은 더 이상 취소할 수 없음)
+        batch = [(statements, future) for statements, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return False
+
+        errors = {}
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for index, (statements, _) in enumerate(batch):
+                conn.execute("SAVEPOINT write_op")
+                try:
+                    for sql, params in statements:
+                        conn.execute(sql, params)
+                    conn.execute("RELEASE write_op")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write_op")
+                    conn.execute("RELEASE write_op")
+                    errors[index] = e
+            conn.execute("COMMIT")
+        except Exception as e:
+            try:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass  # 연결이 끊긴 경우 등 (트랜잭션은 어차피 커밋되지 않음)
+            for _, future in batch:
+                future.set_exception(e)
+            return False
+
+        for index, (_, future) in enumerate(batch):
+            if index in errors:
+                future.set_exception(errors[index])
+            else:
+                future.set_result(None)
+        return len(errors) < len(batch)
@@ -1,17 +1,23 @@
+import argparse
 import requests
 from bs4 import BeautifulSoup
-from datetime import datetime
+from datetime import date, datetime
 import pytz
+import crawl_archive
 
-def analyze_html():
-    url = "https://sejong.korea.ac.kr/koreaSejong/8028/subview.do"
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+def analyze_html(html=None, target_date=None):
+    # 보관된 페이지가 없으면 식단 사이트에서 가져오기
+    if html is None:
+        url = "https://sejong.korea.ac.kr/koreaSejong/8028/subview.do"
+        response = requests.get(url)
+        html = response.text
+    soup = BeautifulSoup(html, 'html.parser')
     
     # 현재 날짜 가져오기
-    korea_tz = pytz.timezone('Asia/Seoul')
-    today = datetime.now(korea_tz)
-    today_str = today.strftime("%m.%d")
+    if target_date is None:
+        korea_tz = pytz.timezone('Asia/Seoul')
+        target_date = datetime.now(korea_tz)
+    today_str = target_date.strftime("%m.%d")
     print(f"Looking for date: {today_str}\n")
     
     print("=== Available Tables ===")
@@ -31,4 +37,17 @@ def analyze_html():
         print("-" * 50)
 
 if __name__ == "__main__":
-    analyze_html() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="식단 페이지 표 구조 확인")
+    parser.add_argument('--date', type=date.fromisoformat, help="보관된 페이지 날짜 (YYYY-MM-DD, crawl_archive.py 참고)")
+    parser.add_argument('--archive', default=crawl_archive.ARCHIVE_DIR, help="보관소 디렉터리")
+    args = parser.parse_args()
+    
+    if args.date:
+        try:
+            response = crawl_archive.load_page(args.date, args.archive)
+        except crawl_archive.PageNotArchived as e:
+            print(e)
+        else:
+            analyze_html(response.text, args.date)
+    else:
+        analyze_html()
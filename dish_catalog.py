@@ -0,0 +1,196 @@
+"""
+요리 목록 (요리마다 바뀌지 않는 정수 ID)
+
+크롤링한 메뉴의 요리 이름은 저장할 때 한 번만 정규화해서 요리 ID 로 바꿉니다.
+- 전각 문자와 띄어쓰기 차이는 같은 요리로 봄 (NFKC, 공백 제거): '치킨마요 덮밥' == '치킨마요덮밥'
+- dish_synonyms 에 등록된 다른 이름도 같은 요리로 봄: '백미밥' -> '쌀밥'
+- 화면 표시용 이름(display)도 요리를 처음 등록할 때 만들어 두고 표시할 때는 ID 로 찾기만 함
+
+ID 는 한 번 정해지면 바뀌지 않으므로 ID -> 요리 정보는 프로세스마다 캐시해도 안전합니다.
+"""
+import argparse
+import sqlite3
+import unicodedata
+from collections import namedtuple
+
+# 기본 동의어 (다른 이름 -> 대표 이름)
+SYNONYMS = {
+    "백미밥": "쌀밥",
+    "흰쌀밥": "쌀밥",
+    "공기밥": "쌀밥",
+}
+
+# 긴 이름에서 앞을 띄어 쓸 단어 (예: 치킨마요덮밥 -> 치킨마요 덮밥)
+SPACED_WORDS = ('덮밥', '김밥', '라면', '우동', '국수')
+
+# menus.dish_ids 의 ID 구분자
+ID_SEPARATOR = ','
+
+# SQLite 변수 개수 제한보다 작게 나눠서 조회
+_QUERY_CHUNK = 500
+
+# name: 대표 이름, display: 화면 표시용 이름
+Dish = namedtuple('Dish', ['id', 'name', 'display'])
+
+_cache = {}  # 데이터베이스 경로 -> {요리 ID: Dish}
+
+def init_dish_tables(conn):
+    """요리 테이블 생성 및 기본 동의어 등록"""
+    c = conn.cursor()
+
+    c.execute('''CREATE TABLE IF NOT EXISTS dishes
+                 (id INTEGER PRIMARY KEY, name TEXT NOT NULL, display TEXT NOT NULL)''')
+
+    # alias: 정규화된 이름 (대표 이름 포함, name_key 참고)
+    c.execute('''CREATE TABLE IF NOT EXISTS dish_synonyms
+                 (alias TEXT PRIMARY KEY, dish_id INTEGER NOT NULL REFERENCES dishes (id))''')
+
+    conn.commit()
+
+    registered = _find_ids(conn, [name_key(alias) for alias in SYNONYMS])
+    for alias, name in SYNONYMS.items():
+        if name_key(alias) not in registered:
+            add_synonym(conn, alias, name)
+
+def clean_name(name):
+    """저장할 요리 이름 (전각 문자 변환, 연속 공백 정리)"""
+    return ' '.join(unicodedata.normalize('NFKC', str(name)).split())
+
+def name_key(name):
+    """같은 요리인지 비교하는 키 (띄어쓰기와 대소문자 무시)"""
+    return clean_name(name).replace(' ', '').casefold()
+
+def display_name(name):
+    """화면 표시용 이름"""
+    if len(name) > 4:
+        for word in SPACED_WORDS:
+            name = name.replace(word, ' ' + word)
+    return ' '.join(name.split())
+
+def _clean_names(names):
+    """저장할 요리 이름 목록 (빈 이름과 '-' 제외)"""
+    return [name for name in (clean_name(name) for name in names) if name and name != '-']
+
+def encode_ids(dish_ids):
+    return ID_SEPARATOR.join(str(dish_id) for dish_id in dish_ids)
+
+def decode_ids(text):
+    """menus.dish_ids 문자열을 요리 ID 튜플로 변환"""
+    return tuple(int(dish_id) for dish_id in text.split(ID_SEPARATOR)) if text else ()
+
+def _chunks(values):
+    values = list(values)
+    for i in range(0, len(values), _QUERY_CHUNK):
+        yield values[i:i + _QUERY_CHUNK]
+
+def _find_ids(conn, keys):
+    """{정규화된 이름: 요리 ID} (등록된 이름만)"""
+    found = {}
+    for chunk in _chunks(set(keys)):
+        found.update(conn.execute(f"""SELECT alias, dish_id FROM dish_synonyms
+                                      WHERE alias IN ({','.join('?' * len(chunk))})""", chunk))
+    return found
+
+def intern(conn, names):
+    """
+    요리 이름 목록을 요리 ID 튜플로 변환 (처음 보는 요리는 새 ID 로 등록)
+    빈 이름과 '-' 는 건너뜀, 호출하는 쪽의 트랜잭션 안이면 그 트랜잭션에 포함해서 등록
+    """
+    names = _clean_names(names)
+    keys = [name_key(name) for name in names]
+    ids = _find_ids(conn, keys)
+    if len(ids) == len(set(keys)):
+        return tuple(ids[key] for key in keys)
+
+    own_transaction = not conn.in_transaction
+    if own_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        # 쓰기 잠금을 얻는 동안 다른 프로세스가 먼저 등록했을 수 있음
+        ids.update(_find_ids(conn, [key for key in keys if key not in ids]))
+        for name, key in zip(names, keys):
+            if key not in ids:
+                cursor = conn.execute("INSERT INTO dishes (name, display) VALUES (?, ?)",
+                                      (name, display_name(name)))
+                conn.execute("INSERT INTO dish_synonyms (alias, dish_id) VALUES (?, ?)",
+                             (key, cursor.lastrowid))
+                ids[key] = cursor.lastrowid
+        if own_transaction:
+            conn.commit()
+    except Exception:
+        if own_transaction:
+            conn.rollback()
+        raise
+    return tuple(ids[key] for key in keys)
+
+def intern_menus(conn, menus):
+    """요리 이름 목록의 목록을 요리 ID 튜플 목록으로 변환 (한 번에 조회/등록)"""
+    menus = [_clean_names(names) for names in menus]
+    dish_ids = intern(conn, [name for names in menus for name in names])
+    result = []
+    start = 0
+    for names in menus:
+        result.append(dish_ids[start:start + len(names)])
+        start += len(names)
+    return result
+
+def _dishes_cache(conn):
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    return _cache.setdefault(path or id(conn), {})
+
+def lookup(conn, dish_ids):
+    """요리 ID 목록을 Dish 튜플로 변환 (한 번 읽은 요리는 캐시에서 찾음)"""
+    cache = _dishes_cache(conn)
+    missing = {dish_id for dish_id in dish_ids if dish_id not in cache}
+    for chunk in _chunks(missing):
+        for row in conn.execute(f"""SELECT id, name, display FROM dishes
+                                    WHERE id IN ({','.join('?' * len(chunk))})""", chunk):
+            cache[row[0]] = Dish(*row)
+    return tuple(cache[dish_id] for dish_id in dish_ids)
+
+def find(conn, name):
+    """이름(동의어, 띄어쓰기 차이 포함)에 해당하는 요리 ID (없으면 None)"""
+    return _find_ids(conn, [name_key(name)]).get(name_key(name))
+
+def add_synonym(conn, alias, name):
+    """
+    alias 를 name 요리의 다른 이름으로 등록하고 요리 ID 반환
+    이미 저장된 메뉴는 그대로이므로 crawl_archive.py reparse 로 다시 저장해야 반영됨
+    """
+    dish_id = intern(conn, [name])[0]
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO dish_synonyms (alias, dish_id) VALUES (?, ?)",
+                     (name_key(alias), dish_id))
+    return dish_id
+
+def main():
+    import menu_store
+
+    parser = argparse.ArgumentParser(description="요리 목록과 동의어 관리")
+    parser.add_argument('--db', default=menu_store.DB_PATH, help="데이터베이스 경로")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('list', help="등록된 요리와 다른 이름")
+
+    alias_parser = subparsers.add_parser('alias', help="동의어 등록")
+    alias_parser.add_argument('alias', help="다른 이름 (예: 백미밥)")
+    alias_parser.add_argument('name', help="대표 이름 (예: 쌀밥)")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    menu_store.init_menu_tables(conn)
+    if args.command == 'alias':
+        dish_id = add_synonym(conn, args.alias, args.name)
+        print(f"{args.alias} -> {args.name} (ID {dish_id})")
+        print("저장된 메뉴에 반영하려면 python crawl_archive.py reparse 를 실행하세요.")
+    else:
+        aliases = {}
+        for alias, dish_id in conn.execute("SELECT alias, dish_id FROM dish_synonyms"):
+            aliases.setdefault(dish_id, []).append(alias)
+        for dish_id, name, display in conn.execute("SELECT id, name, display FROM dishes ORDER BY id"):
+            others = [alias for alias in aliases.get(dish_id, []) if alias != name_key(name)]
+            print(f"{dish_id:>5} {display}" + (f" ({', '.join(sorted(others))})" if others else ""))
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+식단 페이지 로컬 대역 서버 (오프라인 개발/벤치마크용)
+
+실제 식단 페이지와 같은 구조(학생/교직원 식단표 테이블)의 HTML을 날짜별로 생성합니다.
+
+실행: python fake_diet_site.py --port 8600
+사용: KUS_DIET_BASE_URL=http://127.0.0.1:8600 streamlit run app.py
+"""
+import argparse
+import hashlib
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+STUDENT_CATEGORIES = ["조식", "중식 - 한식", "중식 - 일품", "중식 - 분식", "중식 - plus", "석식"]
+STAFF_CATEGORIES = ["중식"]
+
+DISHES = [
+    "김치찌개", "된장찌개", "제육볶음", "계란말이", "깍두기", "배추김치", "미역국",
+    "치킨마요덮밥", "돈까스", "참치김밥", "짜장면", "튀김우동", "잔치국수", "떡볶이",
+    "불고기", "고등어구이", "시금치나물", "콩나물국", "닭갈비", "카레라이스",
+]
+
+WEEKDAYS = ["월", "화", "수", "목", "금"]
+
+def day_menu(day, category):
+    """날짜와 구분에 따라 항상 같은 메뉴 생성"""
+    seed = hashlib.md5(f"{day.isoformat()}{category}".encode()).digest()
+    dishes = [DISHES[b % len(DISHES)] for b in seed[:4]]
+    return "쌀밥*" + "*".join(dishes)
+
+def menu_table(title, categories, monday):
+    days = [monday + timedelta(days=i) for i in range(5)]
+    html = f"<table><caption>{title}</caption><tr><th>구분</th>"
+    html += "".join(f"<th>{day.strftime('%m.%d')}({WEEKDAYS[i]})</th>" for i, day in enumerate(days))
+    html += "</tr>"
+    for category in categories:
+        html += f"<tr><th>{category}</th>"
+        html += "".join(f"<td>{day_menu(day, category)}</td>" for day in days)
+        html += "</tr>"
+    return html + "</table>"
+
+def diet_page(day):
+    """해당 날짜가 속한 주의 식단 페이지"""
+    monday = day - timedelta(days=day.weekday())
+    return ("<html><body>"
+            + menu_table("학생 식단표", STUDENT_CATEGORIES, monday)
+            + menu_table("교직원 식단표", STAFF_CATEGORIES, monday)
+            + "</body></html>")
+
+class FakeDietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    fail_dates = frozenset()  # 500 으로 응답할 날짜 (장애 재현용)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if self.latency:
+            time.sleep(self.latency)
+
+        if 'tempDate' in query:
+            day = datetime.strptime(query['tempDate'][0], "%Y%m%d").date()
+            status = 500 if day in self.fail_dates else 200
+            body = diet_page(day).encode('utf-8') if status == 200 else b"<html><body>error</body></html>"
+        else:
+            status = 200
+            body = b"<html><body>KUS Meals fake diet site</body></html>"
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def make_server(host='127.0.0.1', port=0, latency=0.0, fail_dates=()):
+    """대역 서버 생성 (port=0 이면 빈 포트 사용, server.server_address 로 확인)"""
+    handler = type('Handler', (FakeDietHandler,), {'latency': latency, 'fail_dates': frozenset(fail_dates)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="식단 페이지 로컬 대역 서버")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--latency', type=float, default=0.0, help="응답 지연 (초)")
+    parser.add_argument('--fail-date', type=lambda value: datetime.strptime(value, "%Y-%m-%d").date(),
+                        action='append', default=[], help="500 으로 응답할 날짜 (YYYY-MM-DD, 여러 번 지정 가능)")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency, args.fail_date)
+    print(f"fake diet site: http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
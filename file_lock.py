@@ -0,0 +1,39 @@
+"""
+프로세스 사이 파일 잠금
+
+같은 디렉터리를 여러 프로세스(레플리카)가 함께 쓸 때, 읽고 고쳐 쓰는 구간을 잠금 파일 하나로 보호합니다.
+POSIX 에서는 fcntl.flock, Windows 에서는 msvcrt.locking 을 사용합니다.
+잠금은 열린 파일마다 걸리므로 같은 프로세스의 다른 스레드끼리도 서로 기다립니다.
+"""
+import contextlib
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+@contextlib.contextmanager
+def locked(path):
+    """path 잠금 파일에 배타 잠금 (다른 프로세스가 잡고 있으면 풀릴 때까지 대기)"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK 은 약 10초 뒤 포기하므로 다시 시도
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,187 @@
+import hashlib
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+# 추천 응답 제한 시간 (초) - 이 시간이 지나면 서버에서 스트리밍을 중단
+RECOMMENDATION_DEADLINE = 30
+
+TIMEOUT_MESSAGE = "\n\n⏱️ 응답 시간이 초과되어 추천을 중단했습니다."
+
+# 추천 결과 캐시 최대 항목 수
+RECOMMENDATION_CACHE_SIZE = 1000
+
+_DONE = object()
+
+def fake_model_enabled():
+    """KUS_FAKE_LLM=1 로 명시적으로 켠 경우에만 가짜 모델 사용 (개발/테스트용)"""
+    return os.environ.get('KUS_FAKE_LLM') == '1'
+
+def get_model(api_key):
+    """Gemini 모델 생성 (패키지나 API 키가 없으면 None 반환)"""
+    if not api_key:
+        return None
+    try:
+        import google.generativeai as genai
+    except ImportError:
+        return None
+
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel('gemini-pro')
+
+def build_recommendation_prompt(menu_items, user_preferences):
+    """오늘의 메뉴 항목(menu_model.MenuItem)과 사용자 취향으로 추천 프롬프트 생성"""
+    # 메뉴 텍스트 추출
+    menu_text = "오늘의 메뉴:\n"
+    for item in menu_items:
+        menu_text += f"{item.category}: {item.display}\n"
+
+    # 사용자 취향 텍스트 생성
+    pref_text = "사용자 취향:\n"
+    for category, items in user_preferences.items():
+        if items:  # 선택된 항목이 있는 경우만
+            if category == "알레르기 정보":
+                pref_text += f"⚠️ 알레르기: {', '.join(items)}\n"
+            else:
+                pref_text += f"{category}: {', '.join(items)}\n"
+
+    return f"""
+당신은 사용자의 음식 취향과 알레르기를 고려하여 학식 메뉴를 추천하는 전문가입니다.
+다음 정보를 바탕으로 오늘 학식을 먹을지 추천해주세요:
+
+{menu_text}
+
+{pref_text}
+
+다음 형식으로 답변해주세요:
+1. 추천 여부 (한 문장)
+2. 추천 이유 또는 비추천 이유 (2-3문장)
+3. 주의사항 (알레르기 관련 주의사항이 있다면 반드시 포함)
+"""
+
+def stream_recommendation(model, prompt, deadline=RECOMMENDATION_DEADLINE, cancel_event=None,
+                          on_complete=None):
+    """
+    추천 결과를 도착하는 대로 yield
+    - 모델 호출은 별도 스레드에서 진행하고, deadline(초)이 지나면 스트리밍 중단
+    - 제너레이터가 닫히면(사용자가 페이지를 벗어나 재실행되는 경우 등) cancel_event로 모델 호출도 중단
+    - 응답을 끝까지 받은 경우에만 on_complete(전체 텍스트) 호출
+    """
+    if cancel_event is None:
+        cancel_event = threading.Event()
+    chunks = queue.Queue()
+
+    def produce():
+        try:
+            for chunk in model.generate_content(prompt, stream=True):
+                if cancel_event.is_set():
+                    break
+                text = getattr(chunk, 'text', '')
+                if text:
+                    chunks.put(text)
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            chunks.put(_DONE)
+
+    threading.Thread(target=produce, daemon=True).start()
+    end_time = time.monotonic() + deadline
+    received = []
+
+    try:
+        while True:
+            remaining = end_time - time.monotonic()
+            try:
+                item = chunks.get(timeout=max(remaining, 0))
+            except queue.Empty:
+                yield TIMEOUT_MESSAGE
+                return
+
+            if item is _DONE:
+                if on_complete is not None:
+                    on_complete(''.join(received))
+                return
+            if isinstance(item, Exception):
+                yield f"메뉴 추천 중 오류가 발생했습니다: {str(item)}"
+                return
+            received.append(item)
+            yield item
+    finally:
+        cancel_event.set()
+
+class RecommendationCache:
+    """
+    날짜별 추천 결과 캐시 (같은 날짜와 같은 프롬프트면 모델을 다시 호출하지 않음)
+    메뉴가 바뀌면 menu_diff 변경 이벤트로 해당 날짜 항목만 무효화
+    """
+
+    def __init__(self, max_size=RECOMMENDATION_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # (date, 프롬프트 해시) -> 추천 텍스트
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(day, prompt):
+        return day, hashlib.sha1(prompt.encode('utf-8')).hexdigest()
+
+    def get(self, day, prompt):
+        with self._lock:
+            key = self._key(day, prompt)
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, day, prompt, text):
+        with self._lock:
+            self._entries[self._key(day, prompt)] = text
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_dates(self, dates):
+        """해당 날짜 (YYYY-MM-DD) 의 추천 결과 삭제"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in dates]:
+                del self._entries[key]
+
+    def on_menu_changes(self, changes):
+        """menu_diff.subscribe 용 수신 함수"""
+        self.invalidate_dates({change.date for change in changes})
+
+class _FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+class FakeStreamingModel:
+    """
+    네트워크 없이 Gemini 스트리밍 응답을 흉내내는 가짜 모델 (개발/테스트용)
+    first_token_delay 후 chunk_size 글자씩 delay 간격으로 응답
+    """
+
+    DEFAULT_TEXT = (
+        "1. 오늘 학식은 추천합니다.\n"
+        "2. 선호하시는 밥류와 담백한 반찬이 함께 제공되어 균형 잡힌 한 끼가 될 것 같습니다.\n"
+        "3. 알레르기 유발 식재료가 포함되어 있을 수 있으니 배식 전 확인해주세요."
+    )
+
+    def __init__(self, text=None, chunk_size=8, delay=0.05, first_token_delay=0.3):
+        self.text = text if text is not None else self.DEFAULT_TEXT
+        self.chunk_size = chunk_size
+        self.delay = delay
+        self.first_token_delay = first_token_delay
+        self.prompts = []
+
+    def _iter_chunks(self):
+        time.sleep(self.first_token_delay)
+        for i in range(0, len(self.text), self.chunk_size):
+            if i:
+                time.sleep(self.delay)
+            yield _FakeChunk(self.text[i:i + self.chunk_size])
+
+    def generate_content(self, prompt, stream=False):
+        self.prompts.append(prompt)
+        if stream:
+            return self._iter_chunks()
+        return _FakeChunk(''.join(chunk.text for chunk in self._iter_chunks()))
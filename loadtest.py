@@ -0,0 +1,365 @@
+"""
+동시 접속 부하 테스트 (헤드리스 웹소켓 클라이언트)
+
+브라우저 대신 Streamlit 웹소켓 프로토콜로 직접 접속해서 점심시간 사용 흐름을 N개 세션이 동시에 실행합니다.
+  1. 오늘의 메뉴 열기  2. 주간 메뉴 보기  3. 오늘의 메뉴로 돌아오기
+  4. 회원가입  5. 로그인  6. 리뷰 작성
+
+측정 항목
+- 재실행(rerun) 지연 시간 백분위 (요청 전송 ~ script_finished 수신)
+- SQLite 쓰기 잠금 대기 시간 (테스트 중 주기적으로 BEGIN IMMEDIATE 를 시도하는 프로브)
+- 세션당 메모리 (서버 프로세스 RSS 증가량 / 세션 수, Linux)
+
+기본적으로 fake_diet_site.py 대역 서버와 임시 데이터베이스로 app.py 를 직접 띄워서 측정합니다.
+
+실행: python loadtest.py --sessions 30 --p95-budget 1.0
+      python loadtest.py --url http://127.0.0.1:8501 --pid 1234 --db data.db  (이미 실행 중인 서버)
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+from collections import defaultdict
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.websocket import websocket_connect
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class FlowError(Exception):
+    pass
+
+class Session:
+    """Streamlit 웹소켓 세션 하나 (프론트엔드처럼 위젯 상태를 보관하고 재실행 요청)"""
+
+    def __init__(self, url, timeout):
+        self.ws_url = url.replace('http', 'ws', 1).rstrip('/') + '/_stcore/stream'
+        self.timeout = timeout
+        self.ws = None
+        self.widgets = {}  # id -> (type, proto)
+        self.states = {}   # id -> WidgetState
+        self.errors = []
+        self.latencies = defaultdict(list)
+
+    async def connect(self):
+        self.ws = await websocket_connect(self.ws_url, subprotocols=['streamlit'])
+
+    async def close(self):
+        if self.ws is not None:
+            self.ws.close()
+
+    def _handle(self, msg):
+        if msg.WhichOneof('type') != 'delta' or msg.delta.WhichOneof('type') != 'new_element':
+            return
+        element = msg.delta.new_element
+        element_type = element.WhichOneof('type')
+        proto = getattr(element, element_type)
+        if element_type == 'alert' and proto.format == proto.ERROR:
+            self.errors.append(proto.body)
+        elif element_type == 'exception':
+            self.errors.append(f"{proto.type}: {proto.message}")
+        elif getattr(proto, 'id', '').startswith('$$WIDGET_ID'):
+            self.widgets[proto.id] = (element_type, proto)
+
+    async def rerun(self, step, triggers=()):
+        """현재 위젯 상태로 재실행하고 끝날 때까지 대기 (지연 시간 기록)"""
+        back_msg = BackMsg()
+        back_msg.rerun_script.query_string = ''
+        back_msg.rerun_script.page_script_hash = ''
+        for state in self.states.values():
+            back_msg.rerun_script.widget_states.widgets.append(state)
+        for widget_id in triggers:
+            trigger = back_msg.rerun_script.widget_states.widgets.add()
+            trigger.id = widget_id
+            trigger.trigger_value = True
+
+        errors_before = len(self.errors)
+        start = time.perf_counter()
+        await self.ws.write_message(back_msg.SerializeToString(), binary=True)
+
+        while True:
+            data = await asyncio.wait_for(self.ws.read_message(), self.timeout)
+            if data is None:
+                raise FlowError("웹소켓 연결이 끊어졌습니다.")
+            msg = ForwardMsg()
+            msg.ParseFromString(data)
+            self._handle(msg)
+            if (msg.WhichOneof('type') == 'script_finished'
+                    and msg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN):
+                break
+
+        self.latencies[step].append(time.perf_counter() - start)
+        if len(self.errors) > errors_before:
+            raise FlowError(f"{step}: {self.errors[-1]}")
+
+    def find(self, element_type, label=None, key=None):
+        """위젯 id 찾기 (key 가 있으면 key, 없으면 label 로 검색)"""
+        for widget_id, (found_type, proto) in self.widgets.items():
+            if found_type != element_type:
+                continue
+            if key is not None and widget_id.endswith(f"-{key}"):
+                return widget_id
+            if key is None and proto.label == label:
+                return widget_id
+        raise FlowError(f"위젯을 찾을 수 없습니다: {element_type} {key or label}")
+
+    def stage(self, element_type, value, label=None, key=None):
+        """위젯 값만 변경 (폼 안의 위젯처럼 제출 버튼을 누를 때 함께 전송)"""
+        widget_id = self.find(element_type, label=label, key=key)
+        state = WidgetState(id=widget_id)
+        if element_type in ('text_input', 'text_area'):
+            state.string_value = value
+        elif element_type == 'checkbox':
+            state.bool_value = value
+        elif element_type == 'radio':
+            state.int_value = value
+        elif element_type == 'slider':
+            state.double_array_value.data.append(value)
+        elif element_type == 'date_input':
+            state.string_array_value.data.append(value)
+        self.states[widget_id] = state
+
+    async def set(self, step, element_type, value, label=None, key=None):
+        """위젯 값 변경 후 재실행 (브라우저에서 입력을 마쳤을 때와 동일)"""
+        self.stage(element_type, value, label=label, key=key)
+        await self.rerun(step)
+
+    async def click(self, step, label=None, key=None):
+        await self.rerun(step, triggers=[self.find('button', label=label, key=key)])
+
+async def run_flow(session, index, args):
+    """점심시간 사용 흐름 한 번 실행"""
+    async def think():
+        await asyncio.sleep(random.uniform(0, args.think * 2))
+
+    username = f"load_{uuid.uuid4().hex[:12]}"
+    await session.connect()
+    await session.rerun('open')
+    if args.date:
+        await session.set('open', 'date_input', args.date.replace('-', '/'), key='date_override')
+    await think()
+
+    await session.set('weekly', 'radio', 1, key='menu_mode')
+    await think()
+    await session.set('today', 'radio', 0, key='menu_mode')
+    await think()
+
+    await session.set('signup', 'text_input', username, key='new_username')
+    await session.set('signup', 'text_input', 'password', key='new_password')
+    await session.set('signup', 'text_input', 'password', key='confirm_password')
+    await session.set('signup', 'text_input', f"부하{index}", key='new_name')
+    await session.click('signup', label='회원가입')
+    await think()
+
+    await session.set('login', 'text_input', username, key='login_username')
+    await session.set('login', 'text_input', 'password', key='login_password')
+    await session.click('login', label='로그인')
+    await think()
+
+    # 리뷰 폼은 제출할 때 한 번만 재실행
+    session.stage('slider', float(random.randint(1, 5)), label='별점')
+    session.stage('text_area', f"부하 테스트 리뷰 {index}", label='리뷰 내용')
+    session.stage('checkbox', random.random() < 0.5, label='오늘의 학식 추천')
+    await session.click('review', label='리뷰 저장')
+
+async def run_sessions(args, count, before_close=None):
+    """세션 count개를 동시에 실행 (모든 흐름이 끝나면 before_close 호출 후 연결 종료)"""
+    sessions = [Session(args.url, args.timeout) for _ in range(count)]
+    failures = []
+
+    async def run_one(index, session):
+        await asyncio.sleep(index * args.ramp)
+        try:
+            await run_flow(session, index, args)
+        except (FlowError, asyncio.TimeoutError, OSError) as e:
+            failures.append(str(e) or type(e).__name__)
+
+    await asyncio.gather(*(run_one(i, s) for i, s in enumerate(sessions)))
+    if before_close:
+        before_close()
+    for session in sessions:
+        await session.close()
+    return sessions, failures
+
+class LockProbe(threading.Thread):
+    """주기적으로 쓰기 잠금(BEGIN IMMEDIATE)을 잡아 보며 대기 시간 기록"""
+
+    def __init__(self, db_path, interval=0.05):
+        super().__init__(daemon=True)
+        self.db_path = db_path
+        self.interval = interval
+        self.waits = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        while not self.stopped.is_set():
+            start = time.perf_counter()
+            conn.execute("BEGIN IMMEDIATE")
+            self.waits.append(time.perf_counter() - start)
+            conn.execute("ROLLBACK")
+            self.stopped.wait(self.interval)
+        conn.close()
+
+def rss_bytes(pid):
+    """프로세스 RSS (Linux /proc 기준, 알 수 없으면 None)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_app(args):
+    """대역 식단 사이트와 임시 데이터베이스로 app.py 실행 (url, pid, db_path, 정리 함수 반환)"""
+    sys.path.insert(0, APP_DIR)
+    import fake_diet_site
+
+    site = fake_diet_site.make_server(latency=args.site_latency)
+    threading.Thread(target=site.serve_forever, daemon=True).start()
+
+    work_dir = tempfile.mkdtemp(prefix='kus_load_')
+    db_path = os.path.join(work_dir, 'data.db')
+    port = free_port()
+    env = dict(os.environ,
+               KUS_DB_PATH=db_path,
+               KUS_SNAPSHOT_DIR=os.path.join(work_dir, 'snapshots'),
+               KUS_DIET_BASE_URL=f"http://127.0.0.1:{site.server_address[1]}")
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', 'app.py',
+         '--server.headless', 'true', '--server.port', str(port),
+         '--browser.gatherUsageStats', 'false'],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            urllib.request.urlopen(f"{url}/_stcore/health", timeout=1)
+            break
+        except OSError:
+            if time.monotonic() > deadline or process.poll() is not None:
+                process.kill()
+                raise RuntimeError("app.py 서버를 시작하지 못했습니다.")
+            time.sleep(0.2)
+
+    def stop():
+        process.terminate()
+        process.wait(10)
+        site.shutdown()
+
+    return url, process.pid, db_path, stop
+
+def main():
+    parser = argparse.ArgumentParser(description="KUS Meals 동시 접속 부하 테스트")
+    parser.add_argument('--sessions', type=int, default=20, help="동시 세션 수")
+    parser.add_argument('--ramp', type=float, default=0.05, help="세션 시작 간격 (초)")
+    parser.add_argument('--think', type=float, default=0.3, help="단계 사이 평균 대기 시간 (초)")
+    parser.add_argument('--timeout', type=float, default=60, help="재실행 한 번의 최대 대기 시간 (초)")
+    parser.add_argument('--date', help="개발자 도구로 지정할 날짜 (YYYY-MM-DD, 주말 회피용)")
+    parser.add_argument('--url', help="이미 실행 중인 서버 주소 (생략 시 app.py 를 직접 실행)")
+    parser.add_argument('--pid', type=int, help="--url 서버의 프로세스 id (메모리 측정용)")
+    parser.add_argument('--db', help="--url 서버의 데이터베이스 경로 (잠금 대기 측정용)")
+    parser.add_argument('--site-latency', type=float, default=0.0, help="대역 식단 사이트 응답 지연 (초)")
+    parser.add_argument('--p95-budget', type=float, default=1.0, help="재실행 지연 p95 예산 (초)")
+    parser.add_argument('--lock-wait-budget', type=float, default=0.2, help="쓰기 잠금 대기 p95 예산 (초)")
+    parser.add_argument('--memory-budget', type=float, default=20.0, help="세션당 메모리 예산 (MB)")
+    args = parser.parse_args()
+
+    stop = None
+    if args.url is None:
+        args.url, args.pid, args.db, stop = start_app(args)
+
+    # 세션 하나로 캐시를 데운 뒤 기준 메모리 측정
+    asyncio.run(run_sessions(args, 1))
+    rss_before = rss_bytes(args.pid) if args.pid else None
+    rss_after = None
+
+    def measure():
+        # 모든 세션이 연결된 상태에서 메모리 측정
+        nonlocal rss_after
+        rss_after = rss_bytes(args.pid) if args.pid else None
+
+    probe = LockProbe(args.db) if args.db else None
+    if probe:
+        probe.start()
+
+    start = time.perf_counter()
+    sessions, failures = asyncio.run(run_sessions(args, args.sessions, before_close=measure))
+    elapsed = time.perf_counter() - start
+
+    if probe:
+        probe.stopped.set()
+        probe.join()
+
+    # 결과 집계
+    by_step = defaultdict(list)
+    for session in sessions:
+        for step, values in session.latencies.items():
+            by_step[step].extend(values)
+    all_latencies = [value for values in by_step.values() for value in values]
+
+    print(f"세션 {args.sessions}개, 재실행 {len(all_latencies)}회, {elapsed:.1f}초, 실패 {len(failures)}건")
+    print(f"{'단계':<10}{'횟수':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for step, values in list(by_step.items()) + [('전체', all_latencies)]:
+        print(f"{step:<10}{len(values):>6}" + "".join(
+            f"{percentile(values, p) * 1000:>8.0f}ms" for p in (50, 95, 99, 100)))
+
+    lock_p95 = percentile(probe.waits, 95) if probe else None
+    if probe:
+        print(f"쓰기 잠금 대기: p50 {percentile(probe.waits, 50) * 1000:.1f}ms, "
+              f"p95 {lock_p95 * 1000:.1f}ms, max {max(probe.waits, default=0) * 1000:.1f}ms")
+
+    memory_mb = None
+    if rss_before is not None and rss_after is not None:
+        memory_mb = (rss_after - rss_before) / args.sessions / 1024 / 1024
+        print(f"세션당 메모리: {memory_mb:.2f} MB (RSS {rss_before / 2**20:.0f} -> {rss_after / 2**20:.0f} MB)")
+
+    for message in sorted(set(failures))[:5]:
+        print(f"  실패: {message}")
+
+    if stop:
+        stop()
+
+    # 예산 확인
+    over_budget = []
+    if failures:
+        over_budget.append("실패한 세션")
+    if percentile(all_latencies, 95) > args.p95_budget:
+        over_budget.append("재실행 p95")
+    if lock_p95 is not None and lock_p95 > args.lock_wait_budget:
+        over_budget.append("쓰기 잠금 대기 p95")
+    if memory_mb is not None and memory_mb > args.memory_budget:
+        over_budget.append("세션당 메모리")
+
+    if over_budget:
+        print("예산 초과: " + ", ".join(over_budget))
+        sys.exit(1)
+    print("모든 예산 이내")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+과거 메뉴 열 기반(Arrow) 보관소
+
+몇 년 치 메뉴를 SQLite 행 조회 -> pandas 로 매번 읽지 않도록, 요리 단위 행을 월별 Arrow IPC 파일로 보관합니다.
+- 식당/구분/요리 열은 사전(dictionary) 인코딩이라 같은 문자열을 반복해서 저장하지 않음
+- 압축하지 않은 IPC 파일을 memory map 으로 읽으므로 조회할 때 파일 전체를 메모리에 복사하지 않음
+- 파일은 추가만 하고 수정하지 않음 (같은 날짜가 다시 기록되면 나중 파일의 내용이 우선)
+- 파일 이름의 기록 시각은 월별 잠금(.lock) 안에서 파일을 공개하는 순간에 정하므로 이름 순서 = 공개 순서
+- 합친 파일은 입력 중 가장 나중 파일의 기록 시각을 이어받아, 합치는 동안 기록된 파일이 항상 뒤에 옴
+
+menu_archive/
+    2024-03/.lock
+    2024-03/part-<기록 시각>-<pid>.arrow
+    2024-03/part-<입력 중 마지막 기록 시각>-<pid>-c.arrow    (compact 결과)
+"""
+import argparse
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import dish_catalog
+import file_lock
+
+ARCHIVE_DIR = os.environ.get('KUS_MENU_ARCHIVE', 'menu_archive')
+
+# 월 파티션의 파일이 이 개수를 넘으면 기록 후 하나로 합침
+COMPACT_THRESHOLD = 4
+
+# 요리가 없는 날짜는 restaurant/category/dish 가 null 인 행 하나로 기록 (이전 기록을 덮어씀)
+SCHEMA = pa.schema([
+    ('date', pa.date32()),
+    ('restaurant', pa.dictionary(pa.int8(), pa.string())),
+    ('category', pa.dictionary(pa.int16(), pa.string())),
+    ('dish', pa.dictionary(pa.int32(), pa.string())),
+    ('position', pa.int16()),
+])
+
+LOCK_NAME = '.lock'
+
+def _month_dir(out_dir, month):
+    return os.path.join(out_dir, month)
+
+def _month_lock(out_dir, month):
+    """월 파티션 잠금 (파일 이름 결정 + 공개, compact 의 입력 목록 확정)"""
+    return file_lock.locked(os.path.join(_month_dir(out_dir, month), LOCK_NAME))
+
+def _list_parts(out_dir, month):
+    """월 파티션의 파일 목록 (기록 순)"""
+    try:
+        names = os.listdir(_month_dir(out_dir, month))
+    except FileNotFoundError:
+        return []
+    return sorted(os.path.join(_month_dir(out_dir, month), name)
+                  for name in names if name.endswith('.arrow'))
+
+def _months(start, end):
+    """start ~ end 기간에 걸친 월 (YYYY-MM) 목록"""
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+def _dish_table(rows, dates):
+    """(date, restaurant, category, 요리 이름 목록, position) 행을 요리 단위 Arrow 테이블로 변환"""
+    columns = defaultdict(list)
+    covered = set()
+    for day, restaurant, category, dishes, position in rows:
+        for dish in dishes:
+            columns['date'].append(date.fromisoformat(day))
+            columns['restaurant'].append(restaurant)
+            columns['category'].append(category)
+            columns['dish'].append(dish)
+            columns['position'].append(position)
+            covered.add(day)
+
+    for day in sorted(set(dates) - covered):
+        columns['date'].append(date.fromisoformat(day))
+        for name in ('restaurant', 'category', 'dish', 'position'):
+            columns[name].append(None)
+
+    return pa.table({
+        'date': pa.array(columns['date'], pa.date32()),
+        'restaurant': pa.array(columns['restaurant'], pa.string()).dictionary_encode(),
+        'category': pa.array(columns['category'], pa.string()).dictionary_encode(),
+        'dish': pa.array(columns['dish'], pa.string()).dictionary_encode(),
+        'position': pa.array(columns['position'], pa.int16()),
+    }).cast(SCHEMA)
+
+def _write_part(out_dir, month, table, name=None):
+    """
+    월 파티션에 파일 기록 후 공개 (name 이 없으면 공개하는 순간의 기록 시각으로 이름 지정)
+    반환값: 파일 경로
+    """
+    month_dir = _month_dir(out_dir, month)
+    os.makedirs(month_dir, exist_ok=True)
+    tmp_path = os.path.join(month_dir, f"write-{os.getpid()}-{threading.get_ident()}-{time.time_ns()}.tmp")
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, SCHEMA) as writer:
+            writer.write_table(table)
+
+    if name is not None:
+        path = os.path.join(month_dir, name)
+        os.replace(tmp_path, path)
+        return path
+    with _month_lock(out_dir, month):
+        path = os.path.join(month_dir, f"part-{time.time_ns():020d}-{os.getpid()}.arrow")
+        os.replace(tmp_path, path)
+    return path
+
+def append_days(rows, dates, out_dir=None):
+    """
+    날짜(YYYY-MM-DD) 단위로 메뉴 기록 (rows: 해당 날짜들의 (date, restaurant, category, 요리 이름 목록, position) 행 전체)
+    rows 에 없는 날짜는 메뉴 없음으로 기록
+    """
+    out_dir = out_dir or ARCHIVE_DIR
+    by_month = defaultdict(lambda: ([], set()))
+    for day in dates:
+        by_month[day[:7]][1].add(day)
+    for row in rows:
+        if row[0] in by_month[row[0][:7]][1]:
+            by_month[row[0][:7]][0].append(row)
+
+    paths = []
+    for month, (month_rows, month_dates) in sorted(by_month.items()):
+        paths.append(_write_part(out_dir, month, _dish_table(month_rows, month_dates)))
+        if len(_list_parts(out_dir, month)) > COMPACT_THRESHOLD:
+            compact(month, out_dir)
+    return paths
+
+def _read_parts(paths):
+    """파일을 memory map 으로 읽고, 같은 날짜는 가장 나중 파일의 행만 남김"""
+    tables = []
+    seen = None
+    for path in reversed(paths):
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+        dates = pc.unique(table['date'])
+        if seen is not None:
+            table = table.filter(pc.invert(pc.is_in(table['date'], value_set=seen)))
+            seen = pa.concat_arrays([seen, dates])
+        else:
+            seen = dates
+        tables.append(table)
+    tables.reverse()
+    return tables
+
+def read_month(month, out_dir=None):
+    """월 파티션 전체 (YYYY-MM)"""
+    tables = _read_parts(_list_parts(out_dir or ARCHIVE_DIR, month))
+    return pa.concat_tables(tables) if tables else SCHEMA.empty_table()
+
+def _equal(column, value):
+    """사전 인코딩 열과 문자열 비교 (사전에서 한 번 찾고 정수 인덱스로 비교)"""
+    masks = []
+    for chunk in column.chunks:
+        index = chunk.dictionary.index(value).as_py()
+        if index < 0:
+            masks.append(pa.array([False] * len(chunk)))
+        else:
+            masks.append(pc.fill_null(pc.equal(chunk.indices, index), False))
+    return pa.chunked_array(masks, pa.bool_())
+
+def query(start, end, restaurant=None, category=None, dish=None, out_dir=None):
+    """
+    기간(start ~ end) 요리 행 조회 (필요한 월 파티션만 읽음)
+    반환값: pyarrow.Table (date, restaurant, category, dish, position)
+    """
+    out_dir = out_dir or ARCHIVE_DIR
+    tables = []
+    for month in _months(start, end):
+        for table in _read_parts(_list_parts(out_dir, month)):
+            mask = pc.and_(pc.greater_equal(table['date'], pa.scalar(start, pa.date32())),
+                           pc.less_equal(table['date'], pa.scalar(end, pa.date32())))
+            mask = pc.and_(mask, pc.is_valid(table['dish']))
+            for name, value in (('restaurant', restaurant), ('category', category), ('dish', dish)):
+                if value is not None:
+                    mask = pc.and_(mask, _equal(table[name], value))
+            tables.append(table.filter(mask))
+    return pa.concat_tables(tables) if tables else SCHEMA.empty_table()
+
+def _compacted_name(newest_path):
+    """합친 파일 이름 (입력 중 가장 나중 파일의 기록 시각과 pid 를 이어받음)"""
+    _, stamp, pid = os.path.basename(newest_path)[:-len('.arrow')].split('-')[:3]
+    return f"part-{stamp}-{pid}-c.arrow"
+
+def compact(month, out_dir=None):
+    """
+    월 파티션의 파일을 하나로 합침 (읽는 중인 프로세스는 이전 파일을 계속 사용 가능)
+    합치는 동안 기록된 파일은 입력 목록을 확정한 뒤에 이름이 정해지므로 합친 파일보다 뒤에 옴
+    """
+    out_dir = out_dir or ARCHIVE_DIR
+    with _month_lock(out_dir, month):
+        paths = _list_parts(out_dir, month)
+    if len(paths) <= 1:
+        return None
+    try:
+        tables = _read_parts(paths)
+    except FileNotFoundError:
+        return None  # 다른 프로세스가 먼저 합쳐서 입력 파일이 지워진 경우
+    table = pa.concat_tables(tables).sort_by([('date', 'ascending')]).unify_dictionaries()
+    path = _write_part(out_dir, month, table.combine_chunks(), name=_compacted_name(paths[-1]))
+    for old_path in paths:
+        if old_path == path:
+            continue  # 다른 프로세스가 먼저 합친 결과를 다시 합친 경우
+        try:
+            os.remove(old_path)
+        except FileNotFoundError:
+            pass  # 다른 프로세스가 동시에 합친 경우
+    return path
+
+def _named_rows(conn, rows):
+    """저장소 행의 요리 ID 튜플을 대표 이름 목록으로 변환"""
+    return [(day, restaurant, category, [dish.name for dish in dish_catalog.lookup(conn, dish_ids)], position)
+            for day, restaurant, category, dish_ids, position in rows]
+
+def record_dates(conn, dates, out_dir=None):
+    """저장소의 해당 날짜(YYYY-MM-DD) 메뉴를 보관소에 기록"""
+    if not dates:
+        return []
+    import menu_store
+
+    rows = []
+    for day in sorted(dates):
+        rows.extend(menu_store.load_rows(conn, day, day))
+    return append_days(_named_rows(conn, rows), dates, out_dir)
+
+def main():
+    parser = argparse.ArgumentParser(description="과거 메뉴 열 기반 보관소")
+    parser.add_argument('--archive', default=ARCHIVE_DIR, help="보관소 디렉터리")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="저장된 메뉴 전체를 보관소에 기록")
+    build_parser.add_argument('--db', default=None, help="데이터베이스 경로")
+
+    subparsers.add_parser('compact', help="월별 파일 합치기")
+
+    query_parser = subparsers.add_parser('query', help="기간 요리 조회")
+    query_parser.add_argument('--start', type=date.fromisoformat, required=True)
+    query_parser.add_argument('--end', type=date.fromisoformat, required=True)
+    query_parser.add_argument('--restaurant')
+    query_parser.add_argument('--category')
+    query_parser.add_argument('--dish')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        import menu_store
+
+        conn = menu_store.connect(args.db)
+        dates = [row[0] for row in conn.execute("SELECT DISTINCT date FROM menus ORDER BY date")]
+        rows = menu_store.load_rows(conn, dates[0], dates[-1]) if dates else []
+        paths = append_days(_named_rows(conn, rows), dates, args.archive)
+        print(f"기록한 날짜: {len(dates)}, 파일: {len(paths)}")
+        conn.close()
+    elif args.command == 'compact':
+        months = sorted(name for name in os.listdir(args.archive) if len(name) == 7) if os.path.isdir(args.archive) else []
+        compacted = [month for month in months if compact(month, args.archive)]
+        print(f"합친 월: {len(compacted)}")
+    else:
+        start = time.perf_counter()
+        table = query(args.start, args.end, args.restaurant, args.category, args.dish, args.archive)
+        elapsed = (time.perf_counter() - start) * 1000
+        counts = pc.value_counts(table['dish'].combine_chunks().dictionary_decode()) if table.num_rows else []
+        for item in sorted(counts, key=lambda item: -item['counts'].as_py())[:20]:
+            print(f"{item['values'].as_py()}: {item['counts'].as_py()}")
+        print(f"{table.num_rows}행, {elapsed:.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+메뉴 변경 비교 및 변경 이벤트 전달
+
+새로 파싱한 메뉴와 저장된 메뉴를 (날짜, 식당, 구분) 단위로 요리 ID 목록으로 비교해서 실제로 바뀐 항목만 이벤트로 만듭니다.
+요리 이름의 공백/표기 차이는 저장할 때 dish_catalog 가 같은 ID 로 정규화하고, 표시 순서 차이는 변경으로 보지 않습니다.
+파생 데이터(정적 스냅샷, AI 추천 캐시 등)는 subscribe() 로 등록해 두면 바뀐 날짜만 무효화할 수 있습니다.
+"""
+import threading
+from collections import namedtuple
+
+MENU_SEPARATOR = ' | '
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+
+# kind: added/removed/changed, old/new: 요리 ID 튜플 (없으면 None)
+MenuChange = namedtuple('MenuChange', ['kind', 'date', 'restaurant', 'category', 'old', 'new'])
+
+_listeners = []
+_listeners_lock = threading.Lock()
+
+def normalize_items(menu):
+    """메뉴 문자열을 요리 이름 목록으로 변환 (항목 내부 공백 정리)"""
+    items = []
+    for item in str(menu).split(MENU_SEPARATOR.strip()):
+        item = ' '.join(item.split())
+        if item:
+            items.append(item)
+    return items
+
+def diff_menus(old_rows, new_rows):
+    """
+    (date, restaurant, category, dish_ids, ...) 행 목록 비교
+    반환값: MenuChange 목록 (날짜, 식당, 구분 순)
+    """
+    old = {tuple(row[:3]): tuple(row[3]) for row in old_rows}
+    new = {tuple(row[:3]): tuple(row[3]) for row in new_rows}
+
+    changes = []
+    for key in sorted(old.keys() | new.keys()):
+        if key not in new:
+            changes.append(MenuChange(REMOVED, *key, old[key], None))
+        elif key not in old:
+            changes.append(MenuChange(ADDED, *key, None, new[key]))
+        elif old[key] != new[key]:
+            changes.append(MenuChange(CHANGED, *key, old[key], new[key]))
+    return changes
+
+def changed_dates(changes):
+    """변경이 있는 날짜 (YYYY-MM-DD) 집합"""
+    return {change.date for change in changes}
+
+def subscribe(listener):
+    """변경 이벤트 수신 함수 등록 (listener(changes) 형태로 호출됨)"""
+    with _listeners_lock:
+        if listener not in _listeners:
+            _listeners.append(listener)
+
+def unsubscribe(listener):
+    with _listeners_lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+def notify(changes):
+    """등록된 수신 함수에 변경 이벤트 전달 (수신 함수 오류는 다른 수신 함수에 영향 없음)"""
+    if not changes:
+        return
+    with _listeners_lock:
+        listeners = list(_listeners)
+    for listener in listeners:
+        try:
+            listener(changes)
+        except Exception:
+            pass
@@ -0,0 +1,125 @@
+"""
+프로세스 전체에서 공유하는 읽기 전용 주간 메뉴 객체
+
+st.cache_data 는 캐시를 꺼낼 때마다 데이터프레임을 역직렬화해서 세션마다 새 복사본을 만듭니다.
+WeekMenu 는 튜플과 읽기 전용 매핑으로만 이루어져 있어 여러 스레드(세션)가 같은 객체를 그대로 참조해도 안전하며,
+표시용 텍스트도 만들 때 한 번만 요리 목록(dish_catalog)에서 찾아 이어 붙입니다.
+"""
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+from types import MappingProxyType
+
+import dish_catalog
+import menu_store
+
+WEEKDAYS = ["월요일", "화요일", "수요일", "목요일", "금요일", "토요일", "일요일"]
+
+# 저장소에서 크롤링이 필요한지 다시 확인하는 간격 (초)
+CHECK_INTERVAL = 60
+
+# date: YYYY-MM-DD, date_str: MM.DD, dish_ids: 요리 ID 튜플, menu: 대표 이름을 이은 메뉴 문자열, display: 화면 표시용 텍스트
+MenuItem = namedtuple('MenuItem', ['date', 'date_str', 'weekday', 'restaurant', 'category', 'dish_ids', 'menu', 'display'])
+
+_EMPTY = MappingProxyType({})
+
+class WeekMenu(namedtuple('WeekMenu', ['monday', 'days', 'error'])):
+    """
+    한 주의 메뉴 (읽기 전용)
+    days: {YYYY-MM-DD: {식당: (MenuItem, ...)}} 형태의 읽기 전용 매핑
+    """
+    __slots__ = ()
+
+    def day(self, day, restaurant):
+        """해당 날짜/식당의 메뉴 항목 튜플"""
+        return self.days.get(menu_store.to_date(day).isoformat(), _EMPTY).get(restaurant, ())
+
+def error_week_menu(monday, error):
+    """메뉴 없이 오류만 있는 WeekMenu"""
+    return WeekMenu(monday, _EMPTY, error)
+
+def build_week_menu(conn, monday, rows, error=None):
+    """저장소 행 (date, restaurant, category, dish_ids, position) 으로 WeekMenu 생성"""
+    days = {}
+    for date, restaurant, category, dish_ids, _ in rows:
+        day = menu_store.to_date(date)
+        dishes = dish_catalog.lookup(conn, dish_ids)
+        item = MenuItem(date, day.strftime("%m.%d"), WEEKDAYS[day.weekday()], restaurant, category, dish_ids,
+                        menu_store.MENU_SEPARATOR.join(dish.name for dish in dishes),
+                        menu_store.MENU_SEPARATOR.join(dish.display for dish in dishes))
+        days.setdefault(date, {}).setdefault(restaurant, []).append(item)
+
+    return WeekMenu(
+        monday,
+        MappingProxyType({
+            date: MappingProxyType({restaurant: tuple(items) for restaurant, items in by_restaurant.items()})
+            for date, by_restaurant in days.items()
+        }),
+        error,
+    )
+
+class MenuRegistry:
+    """
+    주별 WeekMenu 를 하나씩만 만들어 모든 세션이 공유
+    - 저장된 메뉴가 없거나 오래되면 menu_store.ensure_week 로 크롤링
+    - 다른 프로세스가 크롤링해서 저장소의 크롤링 시각이 더 최근이면 다시 생성
+    - menu_diff 변경 이벤트가 오면 해당 주만 다시 생성
+    서로 다른 주는 동시에 불러올 수 있도록 주마다 잠금을 따로 두고, 연결도 스레드마다 따로 씀
+    """
+
+    def __init__(self, connect=menu_store.connect):
+        self._connect = connect
+        self._local = threading.local()
+        self._locks_lock = threading.Lock()
+        self._locks = {}  # 월요일 -> 해당 주를 불러오는 동안 잡는 잠금
+        self._weeks = {}  # 월요일 -> (WeekMenu, 마지막 확인 시각, 만들 때의 크롤링 시각)
+
+    @property
+    def conn(self):
+        """현재 스레드의 저장소 연결"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _week_lock(self, monday):
+        with self._locks_lock:
+            return self._locks.setdefault(monday, threading.Lock())
+
+    def cached(self, week_date):
+        """저장소 확인 없이 바로 쓸 수 있는 WeekMenu (없거나 확인 간격이 지났으면 None)"""
+        entry = self._weeks.get(menu_store.week_start(week_date))
+        if entry is not None and time.monotonic() - entry[1] < CHECK_INTERVAL:
+            return entry[0]
+        return None
+
+    def get(self, week_date):
+        week = self.cached(week_date)
+        if week is not None:
+            return week
+
+        monday = menu_store.week_start(week_date)
+        with self._week_lock(monday):
+            entry = self._weeks.get(monday)
+            if entry is not None and time.monotonic() - entry[1] < CHECK_INTERVAL:
+                return entry[0]
+
+            # 크롤링이 필요하면 여기서 수행 (변경이 있으면 on_menu_changes 로 기존 항목이 무효화됨)
+            conn = self.conn
+            error = menu_store.ensure_week(conn, monday)
+            crawled_at = menu_store.week_crawled_at(conn, monday)
+            entry = self._weeks.get(monday)
+            if entry is not None and entry[2] == crawled_at and (error is None or entry[0].days):
+                self._weeks[monday] = (entry[0], time.monotonic(), crawled_at)
+                return entry[0]
+
+            rows = menu_store.load_rows(conn, monday, monday + timedelta(days=6))
+            week = build_week_menu(conn, monday, rows, error if not rows else None)
+            self._weeks[monday] = (week, time.monotonic(), crawled_at)
+            return week
+
+    def on_menu_changes(self, changes):
+        """menu_diff.subscribe 용 수신 함수 (바뀐 날짜가 속한 주만 무효화)"""
+        for monday in {menu_store.week_start(change.date) for change in changes}:
+            self._weeks.pop(monday, None)
@@ -0,0 +1,397 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from datetime import date, datetime, timedelta
+
+import dish_catalog
+import menu_diff
+
+# 데이터베이스 경로 (환경 변수로 변경 가능)
+DB_PATH = os.environ.get('KUS_DB_PATH', 'data.db')
+
+# 저장된 주간 메뉴를 다시 크롤링하기 전까지의 유효 시간 (초)
+MENU_TTL = 3600
+
+RESTAURANTS = ["학생식당", "교직원식당"]
+
+# 크롤링한 메뉴 문자열의 요리 구분자 (crawling.parse_menu 와 동일)
+MENU_SEPARATOR = menu_diff.MENU_SEPARATOR
+
+# 크롤링 임대(lease) 유지 시간 (초) - 임대를 가진 프로세스가 죽어도 이 시간이 지나면 다른 프로세스가 크롤링
+CRAWL_LEASE_TTL = 180
+
+# 크롤링 실패 후 같은 주를 다시 크롤링하기 전까지 대기 시간 (초) - 그동안 다른 프로세스는 같은 오류를 반환
+CRAWL_RETRY_AFTER = 30
+
+# 다른 프로세스의 크롤링 완료를 확인하는 간격 (초)
+CRAWL_POLL_INTERVAL = 0.5
+
+# 주간 크롤링에서 동시에 요청하는 식단 페이지 수 (월~금)
+CRAWL_WORKERS = 5
+
+# 크롤링 임대 소유자 (호스트:프로세스:임의값)
+LEASE_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# 진행 중인 주간 크롤링 (월요일 -> 오류 메시지로 완료되는 Future)
+_flights = {}
+_flights_lock = threading.Lock()
+
+def connect(path=None):
+    """메뉴 저장소 연결 (테이블이 없으면 생성)"""
+    conn = sqlite3.connect(path or DB_PATH, check_same_thread=False)
+    init_menu_tables(conn)
+    return conn
+
+def init_menu_tables(conn):
+    """메뉴 테이블 생성 (이전 버전의 메뉴 문자열 테이블은 요리 ID 목록으로 변환)"""
+    dish_catalog.init_dish_tables(conn)
+    c = conn.cursor()
+
+    # 날짜별 메뉴 테이블 (date: YYYY-MM-DD, dish_ids: 표시 순서대로 dish_catalog 요리 ID 를 쉼표로 이은 문자열)
+    c.execute('''CREATE TABLE IF NOT EXISTS menus
+                 (date TEXT, restaurant TEXT, category TEXT, dish_ids TEXT,
+                  position INTEGER,
+                  PRIMARY KEY (date, restaurant, category))''')
+
+    # 크롤링 완료된 주 (week: 월요일 날짜)
+    c.execute('''CREATE TABLE IF NOT EXISTS crawled_weeks
+                 (week TEXT PRIMARY KEY, crawled_at REAL)''')
+
+    # 메뉴가 바뀌었지만 파생 데이터(스냅샷/보관소/통계)에 아직 반영하지 못한 날짜 (publish_changes 참고)
+    c.execute('''CREATE TABLE IF NOT EXISTS unpublished_dates
+                 (date TEXT PRIMARY KEY)''')
+
+    # 주간 크롤링 임대 (여러 앱 인스턴스 중 하나만 크롤링, error: 마지막 크롤링 실패 메시지)
+    c.execute('''CREATE TABLE IF NOT EXISTS crawl_leases
+                 (week TEXT PRIMARY KEY, owner TEXT, expires_at REAL, error TEXT)''')
+
+    conn.commit()
+
+    if 'menu' in {row[1] for row in conn.execute("PRAGMA table_info(menus)")}:
+        _migrate_menu_text(conn)
+
+def _migrate_menu_text(conn):
+    """menu 열(' | ' 로 이은 요리 이름)을 dish_ids 열로 변환"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # 다른 프로세스가 먼저 변환했을 수 있음
+        if 'menu' in {row[1] for row in conn.execute("PRAGMA table_info(menus)")}:
+            rows = conn.execute("SELECT date, restaurant, category, menu, position FROM menus").fetchall()
+            dish_ids = dish_catalog.intern_menus(conn, [menu_diff.normalize_items(row[3]) for row in rows])
+            conn.execute('''CREATE TABLE menus_by_id
+                            (date TEXT, restaurant TEXT, category TEXT, dish_ids TEXT,
+                             position INTEGER,
+                             PRIMARY KEY (date, restaurant, category))''')
+            conn.executemany("INSERT INTO menus_by_id VALUES (?, ?, ?, ?, ?)",
+                             [(row[0], row[1], row[2], dish_catalog.encode_ids(ids), row[4])
+                              for row, ids in zip(rows, dish_ids)])
+            # DROP TABLE 은 이전 테이블의 트리거(analytics 변경 기록)도 지우므로 정의를 보관했다가 다시 생성
+            # (api.py 처럼 analytics 를 초기화하지 않는 프로세스가 변환해도 트리거가 남도록)
+            triggers = [row[0] for row in conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'menus'")]
+            conn.execute("DROP TABLE menus")
+            conn.execute("ALTER TABLE menus_by_id RENAME TO menus")
+            for sql in triggers:
+                conn.execute(sql)
+            # 통계가 있으면 변환한 날짜를 다시 계산 대상으로 등록 (새 테이블에 넣은 행은 트리거를 거치지 않음)
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analytics_dirty'").fetchone():
+                conn.execute("INSERT OR IGNORE INTO analytics_dirty (date) SELECT DISTINCT date FROM menus")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def to_date(value):
+    """datetime/date/YYYY-MM-DD 문자열을 date로 변환"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+def week_start(value):
+    """해당 날짜가 속한 주의 월요일"""
+    day = to_date(value)
+    return day - timedelta(days=day.weekday())
+
+def menu_rows(monday, student_df, staff_df):
+    """크롤링 결과 데이터프레임을 (date, restaurant, category, menu 문자열, position) 행으로 변환"""
+    # parse_menu 의 날짜(MM.DD)를 해당 주의 실제 날짜로 변환
+    dates = {}
+    for i in range(7):
+        day = monday + timedelta(days=i)
+        dates[day.strftime("%m.%d")] = day.isoformat()
+
+    rows = []
+    for restaurant, df in zip(RESTAURANTS, (student_df, staff_df)):
+        for position, (_, row) in enumerate(df.iterrows()):
+            day = dates.get(row['날짜'])
+            if day is None:
+                continue
+            rows.append((day, restaurant, str(row['구분']), row['메뉴'], position))
+    return rows
+
+def load_rows(conn, start, end):
+    """기간 메뉴를 (date, restaurant, category, dish_ids, position) 행 목록으로 반환 (dish_ids: 요리 ID 튜플)"""
+    return [(day, restaurant, category, dish_catalog.decode_ids(dish_ids), position)
+            for day, restaurant, category, dish_ids, position in conn.execute(
+                """SELECT date, restaurant, category, dish_ids, position FROM menus
+                   WHERE date BETWEEN ? AND ?
+                   ORDER BY date, restaurant, position""",
+                (to_date(start).isoformat(), to_date(end).isoformat()))]
+
+def intern_rows(conn, rows):
+    """menu_rows 의 행 (메뉴 문자열) 을 요리 ID 튜플 행으로 변환 (처음 보는 요리는 등록)"""
+    dish_ids = dish_catalog.intern_menus(conn, [menu_diff.normalize_items(row[3]) for row in rows])
+    return [(row[0], row[1], row[2], ids, row[4]) for row, ids in zip(rows, dish_ids)]
+
+def save_rows(conn, start, end, rows):
+    """
+    기간(start ~ end)의 메뉴를 rows (menu_rows 형식) 로 교체하되 실제로 바뀐 항목만 기록
+    바뀐 날짜는 같은 트랜잭션에서 unpublished_dates 에 기록 (publish_changes 가 반영한 뒤 삭제)
+    반환값: menu_diff.MenuChange 목록
+    """
+    rows = intern_rows(conn, rows)
+    old_rows = load_rows(conn, start, end)
+    changes = menu_diff.diff_menus(old_rows, rows)
+    stored = {tuple(row[:3]): tuple(row[3:]) for row in old_rows}
+
+    with conn:
+        for change in changes:
+            if change.kind == menu_diff.REMOVED:
+                conn.execute("DELETE FROM menus WHERE date = ? AND restaurant = ? AND category = ?",
+                             (change.date, change.restaurant, change.category))
+        # 변경된 항목과 표시 순서만 바뀐 항목 기록
+        conn.executemany("""INSERT OR REPLACE INTO menus
+                            (date, restaurant, category, dish_ids, position)
+                            VALUES (?, ?, ?, ?, ?)""",
+                         [(day, restaurant, category, dish_catalog.encode_ids(dish_ids), position)
+                          for day, restaurant, category, dish_ids, position in rows
+                          if stored.get((day, restaurant, category)) != (dish_ids, position)])
+        conn.executemany("INSERT OR IGNORE INTO unpublished_dates (date) VALUES (?)",
+                         [(day,) for day in sorted(menu_diff.changed_dates(changes))])
+    return changes
+
+def unpublished_dates(conn, start, end):
+    """기간 중 파생 데이터에 아직 반영하지 못한 날짜 (YYYY-MM-DD) 집합"""
+    return {row[0] for row in conn.execute("SELECT date FROM unpublished_dates WHERE date BETWEEN ? AND ?",
+                                           (to_date(start).isoformat(), to_date(end).isoformat()))}
+
+def mark_week_crawled(conn, week_date):
+    """주간 메뉴 크롤링 완료 기록 (is_week_fresh 기준)"""
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO crawled_weeks (week, crawled_at) VALUES (?, ?)",
+                     (week_start(week_date).isoformat(), time.time()))
+
+def failed_days_message(days):
+    """가져오지 못한 날(DayMenu) 목록의 오류 메시지"""
+    error = f"{days[0].date} {days[0].error}"
+    if len(days) > 1:
+        error += f" (외 {len(days) - 1}일)"
+    return error
+
+def publish_changes(conn, week_date, changes):
+    """
+    변경된 날짜의 정적 스냅샷, 열 기반 보관소, 요리별 통계만 갱신하고 변경 이벤트 전달
+    같은 주에서 이전에 반영하지 못한 날짜(unpublished_dates)도 함께 반영하고, 모두 끝난 뒤에만 반영 완료로 기록
+    (중간에 실패하면 날짜가 남아 있으므로 다음 크롤링이나 ensure_week 에서 다시 반영)
+    """
+    import analytics
+    import snapshot
+    try:
+        import menu_archive
+    except ImportError:
+        menu_archive = None  # pyarrow 가 없는 환경에서는 열 기반 보관소만 건너뜀
+
+    monday = week_start(week_date)
+    changed = menu_diff.changed_dates(changes)
+    pending = unpublished_dates(conn, monday, monday + timedelta(days=6))
+    dates = changed | pending
+    if dates or monday.isoformat() not in snapshot.read_manifest()['week']:
+        snapshot.export_week(conn, monday, dates=dates or None)
+    if dates:
+        if menu_archive is not None:
+            menu_archive.record_dates(conn, dates)
+        analytics.refresh(conn)
+        with conn:
+            conn.executemany("DELETE FROM unpublished_dates WHERE date = ?", [(day,) for day in sorted(dates)])
+
+    # 이전에 반영하지 못한 날짜는 바뀐 내용을 알 수 없으므로 날짜만 담아 전달 (수신 함수는 날짜로 무효화)
+    menu_diff.notify(changes + [menu_diff.MenuChange(menu_diff.CHANGED, day, None, None, None, None)
+                                for day in sorted(pending - changed)])
+
+def record_days(conn, week_date, days):
+    """
+    크롤링한 날짜별 결과(crawling.DayMenu) 중 가져온 날짜만 저장하고 파생 데이터 갱신
+    가져오지 못한 날은 저장된 메뉴를 그대로 두고 (메뉴 삭제로 취급하지 않음), 모두 가져온 경우에만 크롤링 완료로 기록
+    반환값: 오류 메시지 (모두 가져왔으면 None)
+    """
+    monday = week_start(week_date)
+    changes = []
+    for day in days:
+        if not day.error:
+            changes.extend(save_rows(conn, day.date, day.date, menu_rows(monday, day.student, day.staff)))
+    publish_changes(conn, monday, changes)
+
+    failed = [day for day in days if day.error]
+    if failed:
+        return failed_days_message(failed)
+    mark_week_crawled(conn, monday)
+    return None
+
+def refresh_day(conn, day):
+    """
+    하루 메뉴만 다시 크롤링해서 바뀐 항목만 반영 (나머지 날짜의 캐시는 유지)
+    반환값: (변경 목록, 오류 메시지)
+    """
+    from crawling import get_day_menu
+
+    day = to_date(day)
+    student_df, staff_df, error = get_day_menu(day)
+    if error:
+        return [], error
+
+    changes = save_rows(conn, day, day, menu_rows(week_start(day), student_df, staff_df))
+    publish_changes(conn, day, changes)
+    return changes, None
+
+def week_crawled_at(conn, week_date):
+    """주간 메뉴 크롤링 시각 (없으면 None)"""
+    row = conn.execute("SELECT crawled_at FROM crawled_weeks WHERE week = ?",
+                       (week_start(week_date).isoformat(),)).fetchone()
+    return row[0] if row else None
+
+def is_week_fresh(conn, week_date, ttl=MENU_TTL):
+    """주간 메뉴가 ttl(초) 안에 크롤링되었는지 여부"""
+    crawled_at = week_crawled_at(conn, week_date)
+    return crawled_at is not None and time.time() - crawled_at < ttl
+
+def acquire_crawl_lease(conn, week_date):
+    """
+    주간 크롤링 임대 획득 시도 (임대가 없거나 만료된 경우에만 획득)
+    반환값: (획득 여부, 임대에 남아 있는 다른 프로세스의 크롤링 오류)
+    """
+    week = week_start(week_date).isoformat()
+    now = time.time()
+    with conn:
+        cursor = conn.execute("""INSERT INTO crawl_leases (week, owner, expires_at, error)
+                                 VALUES (?, ?, ?, NULL)
+                                 ON CONFLICT (week) DO UPDATE
+                                 SET owner = excluded.owner, expires_at = excluded.expires_at, error = NULL
+                                 WHERE crawl_leases.expires_at <= ?""",
+                              (week, LEASE_OWNER, now + CRAWL_LEASE_TTL, now))
+    if cursor.rowcount == 1:
+        return True, None
+
+    row = conn.execute("SELECT error FROM crawl_leases WHERE week = ?", (week,)).fetchone()
+    return False, row[0] if row else None
+
+def release_crawl_lease(conn, week_date, error=None):
+    """
+    크롤링 임대 반환
+    실패한 경우에는 CRAWL_RETRY_AFTER 동안 오류를 남겨 두어 다른 프로세스가 곧바로 다시 크롤링하지 않게 함
+    """
+    week = week_start(week_date).isoformat()
+    with conn:
+        if error is None:
+            conn.execute("DELETE FROM crawl_leases WHERE week = ? AND owner = ?", (week, LEASE_OWNER))
+        else:
+            conn.execute("""UPDATE crawl_leases SET expires_at = ?, error = ?
+                            WHERE week = ? AND owner = ?""",
+                         (time.time() + CRAWL_RETRY_AFTER, error, week, LEASE_OWNER))
+
+def crawl_week(conn, week_date, ttl=MENU_TTL):
+    """
+    임대를 얻은 프로세스만 주간 메뉴를 크롤링해서 저장
+    다른 프로세스가 크롤링 중이면 그 결과(저장된 메뉴 또는 오류)를 기다림
+    반환값: 오류 메시지 (성공하면 None, 일부 날짜만 실패하면 나머지 날짜는 저장하고 실패한 날짜의 오류)
+    """
+    from crawling import fetch_range
+
+    monday = week_start(week_date)
+    while True:
+        acquired, error = acquire_crawl_lease(conn, monday)
+        # 임대를 얻기 직전에 다른 프로세스가 크롤링을 끝냈을 수 있으므로 다시 확인
+        if is_week_fresh(conn, monday, ttl):
+            if acquired:
+                release_crawl_lease(conn, monday)
+            return None
+        if acquired:
+            break
+        if error:
+            return error
+        time.sleep(CRAWL_POLL_INTERVAL)
+
+    error = None
+    try:
+        days = fetch_range(monday, monday + timedelta(days=4), max_workers=CRAWL_WORKERS)
+        error = record_days(conn, monday, days)
+    except Exception as e:
+        error = f"메뉴를 저장하는 중 오류가 발생했습니다: {str(e)}"
+        raise
+    finally:
+        release_crawl_lease(conn, monday, error)
+    return error
+
+def ensure_week(conn, week_date, ttl=MENU_TTL):
+    """
+    저장된 주간 메뉴가 없거나 오래되었으면 크롤링해서 저장
+    같은 주를 동시에 요청한 스레드는 진행 중인 크롤링 하나의 결과를 함께 기다림
+    반환값: 오류 메시지 (성공하면 None)
+    """
+    if is_week_fresh(conn, week_date, ttl):
+        monday = week_start(week_date)
+        if unpublished_dates(conn, monday, monday + timedelta(days=6)):
+            try:
+                publish_changes(conn, monday, [])
+            except Exception:
+                pass  # 저장된 메뉴는 그대로 제공하고 반영하지 못한 날짜는 다음 호출에서 다시 시도
+        return None
+
+    monday = week_start(week_date)
+    with _flights_lock:
+        flight = _flights.get(monday)
+        leader = flight is None
+        if leader:
+            flight = _flights[monday] = Future()
+
+    if not leader:
+        return flight.result()
+
+    try:
+        error = crawl_week(conn, monday, ttl)
+    except BaseException as e:
+        flight.set_exception(e)
+        raise
+    else:
+        flight.set_result(error)
+        return error
+    finally:
+        with _flights_lock:
+            del _flights[monday]
+
+def load_menus(conn, start, end, restaurant=None):
+    """기간(start ~ end) 메뉴를 dict 목록으로 반환 (menu: 요리 대표 이름 목록, dish_ids: 요리 ID 목록)"""
+    query = """SELECT date, restaurant, category, dish_ids FROM menus
+               WHERE date BETWEEN ? AND ?"""
+    params = [to_date(start).isoformat(), to_date(end).isoformat()]
+    if restaurant:
+        query += " AND restaurant = ?"
+        params.append(restaurant)
+    query += " ORDER BY date, restaurant, position"
+
+    menus = []
+    for row in conn.execute(query, params).fetchall():
+        dish_ids = dish_catalog.decode_ids(row[3])
+        menus.append({
+            'date': row[0],
+            'restaurant': row[1],
+            'category': row[2],
+            'menu': [dish.name for dish in dish_catalog.lookup(conn, dish_ids)],
+            'dish_ids': list(dish_ids),
+        })
+    return menus
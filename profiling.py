@@ -0,0 +1,101 @@
+"""
+개발자 도구용 샘플링 프로파일러
+
+프로파일링 중인 스레드의 호출 스택을 SAMPLE_INTERVAL 마다 기록합니다.
+- folded() : flamegraph.pl / speedscope 에서 바로 열 수 있는 folded stacks 텍스트
+- top_functions() / top_lines() : 가장 오래 실행된 함수와 코드 줄
+
+프로파일링을 시작하지 않으면 아무 스레드도 만들지 않으므로 평소 실행에는 영향이 없습니다.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# 스택 기록 간격 (초)
+SAMPLE_INTERVAL = 0.005
+
+# 상위 목록 표시 개수
+TOP_N = 15
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    """
+    with 블록 안의 실행을 runs 회까지 누적해서 기록
+    (Streamlit 재실행마다 같은 객체로 with 블록을 다시 실행)
+    """
+
+    def __init__(self, runs=1, interval=SAMPLE_INTERVAL):
+        self.runs_left = runs
+        self.interval = interval
+        self.stacks = Counter()  # (바깥 -> 안쪽 프레임 이름, ...) -> 샘플 수
+        self.lines = Counter()   # (파일:줄, 함수) -> 샘플 수
+        self.samples = 0
+        self.elapsed = 0.0
+        self._stop = None
+        self._thread = None
+
+    @property
+    def done(self):
+        return self.runs_left <= 0
+
+    def __enter__(self):
+        self._target = threading.get_ident()
+        self._base = sys._getframe(1)  # 이 프레임과 그 바깥(Streamlit 실행기)은 기록하지 않음
+        self._stop = threading.Event()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample, name="kus-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed += time.perf_counter() - self._started
+        self.runs_left -= 1
+        return False
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+
+            leaf = frame
+            stack = []
+            while frame is not None and frame is not self._base:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if frame is None or not stack:
+                continue  # with 블록 밖을 실행 중
+
+            self.stacks[tuple(reversed(stack))] += 1
+            self.lines[(f"{os.path.basename(leaf.f_code.co_filename)}:{leaf.f_lineno}", leaf.f_code.co_name)] += 1
+            self.samples += 1
+
+    def folded(self):
+        """folded stacks 형식 (한 줄에 '바깥;...;안쪽 샘플수')"""
+        return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit=TOP_N):
+        """[(함수, 자체 샘플 비율, 누적 샘플 비율), ...] (자체 비율 순)"""
+        if not self.samples:
+            return []
+        self_counts = Counter()
+        total_counts = Counter()
+        for stack, count in self.stacks.items():
+            self_counts[stack[-1]] += count
+            for label in set(stack):  # 재귀 호출은 한 번만 계산
+                total_counts[label] += count
+        return [(label, count / self.samples, total_counts[label] / self.samples)
+                for label, count in self_counts.most_common(limit)]
+
+    def top_lines(self, limit=TOP_N):
+        """[(파일:줄, 함수, 샘플 비율), ...] (실행 중이던 코드 줄 기준)"""
+        if not self.samples:
+            return []
+        return [(line, func, count / self.samples)
+                for (line, func), count in self.lines.most_common(limit)]
@@ -0,0 +1,74 @@
+import html
+
+# 테이블 스타일 정의
+TABLE_STYLE = """
+<style>
+    .menu-table {
+        width: 100%;
+        border-collapse: collapse;
+        margin: 10px 0;
+        background-color: rgb(17, 17, 17);
+        color: rgb(238, 238, 238);
+    }
+    .menu-table th {
+        background-color: rgb(38, 39, 48);
+        color: rgb(238, 238, 238);
+        padding: 12px;
+        text-align: left;
+        border: 1px solid rgb(38, 39, 48);
+    }
+    .menu-table td {
+        padding: 12px;
+        border: 1px solid rgb(38, 39, 48);
+        background-color: rgb(17, 17, 17);
+    }
+    .menu-table tr:hover td {
+        background-color: rgb(38, 39, 48);
+    }
+    .section-title {
+        color: rgb(238, 238, 238);
+        margin: 20px 0 10px 0;
+        font-size: 1.2em;
+    }
+</style>
+"""
+
+def menu_table_html(rows):
+    """(날짜, 구분, 메뉴) 행 목록을 HTML 테이블로 변환"""
+    html_table = "<table class='menu-table'>"
+    # 헤더 추가
+    html_table += "<tr><th>날짜</th><th>구분</th><th>메뉴</th></tr>"
+
+    # 각 행 추가
+    for date_str, category, menu in rows:
+        html_table += (f"<tr><td>{html.escape(str(date_str))}</td>"
+                       f"<td>{html.escape(str(category))}</td>"
+                       f"<td>{html.escape(str(menu))}</td></tr>")
+
+    html_table += "</table>"
+    return html_table
+
+def menu_fragment_html(student_rows, staff_rows):
+    """학생식당/교직원식당 메뉴 HTML 조각 (스타일 제외)"""
+    fragment = ""
+    if student_rows:
+        fragment += "<h4>🎈 학생 식당</h4>" + menu_table_html(student_rows)
+    if staff_rows:
+        fragment += "<h4>📍 교직원 식당</h4>" + menu_table_html(staff_rows)
+    return fragment
+
+def menu_page_html(title, fragment):
+    """정적 파일로 제공할 전체 HTML 페이지"""
+    return f"""<!DOCTYPE html>
+<html lang="ko">
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)}</title>
+{TABLE_STYLE}
+</head>
+<body style="background-color: #0E1117; color: #FAFAFA; font-family: sans-serif;">
+<h3>{html.escape(title)}</h3>
+{fragment}
+</body>
+</html>
+"""
@@ -0,0 +1,203 @@
+"""
+일간/주간 메뉴 정적 스냅샷 생성
+
+크롤링이 끝날 때마다 저장된 메뉴로 HTML/JSON 파일을 미리 만들어 둡니다.
+파일 이름에 내용 해시가 들어가므로 정적 파일 서버에서 오래 캐시해도 안전하며,
+manifest.json 으로 날짜별 최신 파일을 찾을 수 있습니다.
+
+여러 프로세스(레플리카)가 같은 디렉터리에 쓰므로 스냅샷 생성과 manifest 갱신은 파일 잠금(.lock) 안에서 하고,
+manifest 가 더 이상 가리키지 않는 파일은 PRUNE_AFTER 가 지나면 지웁니다.
+(이전 manifest 를 읽은 클라이언트가 잠시 동안은 이전 파일을 받을 수 있도록 바로 지우지 않음)
+
+snapshots/
+    manifest.json
+    .lock
+    day/2024-03-04.<hash>.json | .html | .fragment.html
+    week/2024-03-04.<hash>.json | .html | .fragment.html
+"""
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+
+import dish_catalog
+import file_lock
+import menu_store
+from render import menu_fragment_html, menu_page_html
+
+SNAPSHOT_DIR = os.environ.get('KUS_SNAPSHOT_DIR', 'snapshots')
+MANIFEST_NAME = 'manifest.json'
+LOCK_NAME = '.lock'
+
+# manifest 에서 빠진 스냅샷 파일을 지우기까지 기다리는 시간 (초)
+PRUNE_AFTER = 3600
+
+SNAPSHOT_KINDS = ('day', 'week')
+
+_manifest_cache = {}
+_export_lock = threading.Lock()
+
+@contextlib.contextmanager
+def _export_guard(out_dir):
+    """스냅샷 생성/manifest 갱신 잠금 (같은 프로세스의 스레드와 다른 프로세스 모두 제외)"""
+    with _export_lock, file_lock.locked(os.path.join(out_dir, LOCK_NAME)):
+        yield
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _write_hashed(out_dir, kind, name, suffix, data):
+    """내용 해시가 포함된 파일 이름으로 저장 (이미 있으면 건너뜀)"""
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    rel_path = f"{kind}/{name}.{digest}{suffix}"
+    path = os.path.join(out_dir, rel_path)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_atomic(path, data)
+    return rel_path
+
+def _display_rows(menus, restaurant, displays):
+    """저장소 메뉴를 화면 표시용 (날짜, 구분, 메뉴) 행으로 변환 (displays: 요리 ID -> 표시용 이름)"""
+    rows = []
+    for item in menus:
+        if item['restaurant'] != restaurant:
+            continue
+        date_str = item['date'][5:].replace('-', '.')  # YYYY-MM-DD -> MM.DD
+        menu_text = menu_store.MENU_SEPARATOR.join(displays[dish_id] for dish_id in item['dish_ids'])
+        rows.append((date_str, item['category'], menu_text))
+    return rows
+
+def _export(out_dir, kind, name, title, start, end, menus, displays):
+    """JSON/HTML/조각 파일 생성 후 manifest 항목 반환"""
+    body = json.dumps({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'restaurant': None,
+        'menus': menus,
+    }, ensure_ascii=False).encode('utf-8')
+
+    fragment = menu_fragment_html(
+        _display_rows(menus, "학생식당", displays),
+        _display_rows(menus, "교직원식당", displays),
+    )
+    page = menu_page_html(title, fragment)
+
+    return {
+        'json': _write_hashed(out_dir, kind, name, '.json', body),
+        'html': _write_hashed(out_dir, kind, name, '.html', page.encode('utf-8')),
+        'fragment': _write_hashed(out_dir, kind, name, '.fragment.html', fragment.encode('utf-8')),
+    }
+
+def read_manifest(out_dir=SNAPSHOT_DIR):
+    """manifest.json 읽기 (파일이 바뀌지 않았으면 메모리 캐시 사용)"""
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return {'day': {}, 'week': {}}
+
+    version = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    cached = _manifest_cache.get(path)
+    if cached is None or cached[0] != version:
+        with open(path, encoding='utf-8') as f:
+            cached = (version, json.load(f))
+        _manifest_cache[path] = cached
+    return cached[1]
+
+def prune(out_dir=SNAPSHOT_DIR, manifest=None, older_than=PRUNE_AFTER):
+    """
+    manifest 가 가리키지 않는 스냅샷 파일 중 older_than(초)보다 오래된 파일 삭제
+    (_export_guard 안에서 호출, 반환값: 지운 파일 수)
+    """
+    manifest = manifest if manifest is not None else read_manifest(out_dir)
+    referenced = {path for kind in SNAPSHOT_KINDS for entry in manifest[kind].values() for path in entry.values()}
+    cutoff = time.time() - older_than
+    removed = 0
+    for kind in SNAPSHOT_KINDS:
+        try:
+            names = os.listdir(os.path.join(out_dir, kind))
+        except FileNotFoundError:
+            continue
+        for name in names:
+            rel_path = f"{kind}/{name}"
+            path = os.path.join(out_dir, rel_path)
+            try:
+                if rel_path not in referenced and os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+def export_week(conn, week_date, out_dir=SNAPSHOT_DIR, dates=None):
+    """
+    해당 주의 일간/주간 스냅샷 생성 및 manifest 갱신
+    dates (YYYY-MM-DD 집합) 를 주면 그 날짜의 일간 스냅샷만 다시 생성
+    """
+    monday = menu_store.week_start(week_date)
+    sunday = monday + timedelta(days=6)
+    menus = menu_store.load_menus(conn, monday, sunday)
+    displays = {dish.id: dish.display
+                for dish in dish_catalog.lookup(conn, [dish_id for item in menus for dish_id in item['dish_ids']])}
+
+    with _export_guard(out_dir):
+        manifest = _export_week(out_dir, monday, sunday, menus, dates, displays)
+        prune(out_dir, manifest)
+        return manifest
+
+def _export_week(out_dir, monday, sunday, menus, dates, displays):
+    # 잠금을 얻기 전에 다른 프로세스가 바꿨을 수 있으므로 캐시 대신 파일을 다시 읽음
+    _manifest_cache.pop(os.path.join(out_dir, MANIFEST_NAME), None)
+    manifest = read_manifest(out_dir)
+    manifest = {'day': dict(manifest['day']), 'week': dict(manifest['week'])}
+
+    for i in range(7):
+        day = monday + timedelta(days=i)
+        if dates is not None and day.isoformat() not in dates:
+            continue
+        day_menus = [item for item in menus if item['date'] == day.isoformat()]
+        if day_menus:
+            manifest['day'][day.isoformat()] = _export(
+                out_dir, 'day', day.isoformat(), f"{day.strftime('%Y년 %m월 %d일')} 학식 메뉴",
+                day, day, day_menus, displays)
+        else:
+            manifest['day'].pop(day.isoformat(), None)
+
+    manifest['week'][monday.isoformat()] = _export(
+        out_dir, 'week', monday.isoformat(), f"{monday.strftime('%Y년 %m월 %d일')} 주간 학식 메뉴",
+        monday, sunday, menus, displays)
+
+    _write_atomic(os.path.join(out_dir, MANIFEST_NAME),
+                  json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+def load_day_fragment(day, out_dir=SNAPSHOT_DIR):
+    """미리 렌더링된 일간 메뉴 HTML 조각 (없으면 None)"""
+    entry = read_manifest(out_dir)['day'].get(menu_store.to_date(day).isoformat())
+    if entry is None:
+        return None
+    try:
+        with open(os.path.join(out_dir, entry['fragment']), encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+if __name__ == "__main__":
+    import sys
+
+    from datetime import datetime
+
+    import pytz
+
+    # 저장된 메뉴로 스냅샷 다시 생성: python snapshot.py [YYYY-MM-DD ...] (날짜 생략 시 한국 시간 기준 이번 주)
+    today = datetime.now(pytz.timezone('Asia/Seoul')).date()
+
+    for value in sys.argv[1:] or [today.isoformat()]:
+        manifest = export_week(menu_store.connect(), value)
+        print(f"{menu_store.week_start(value)}: {manifest['week'][menu_store.week_start(value).isoformat()]['html']}")
@@ -0,0 +1,134 @@
+"""
+db_writer.WriteQueue 테스트 (임시 데이터베이스 사용)
+
+실행: python -m pytest -q test_db_writer.py
+"""
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import db_writer
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'data.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE reviews (username TEXT PRIMARY KEY, rating INTEGER)")
+    conn.close()
+    return path
+
+def stored(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return dict(conn.execute("SELECT username, rating FROM reviews"))
+    finally:
+        conn.close()
+
+def insert(username, rating):
+    return [("INSERT INTO reviews (username, rating) VALUES (?, ?)", (username, rating))]
+
+class PausedQueue(db_writer.WriteQueue):
+    """resume 전까지 배치를 모으지 않는 쓰기 큐 (그 사이에 넣은 작업은 한 배치로 커밋됨)"""
+
+    def __init__(self, *args, **kwargs):
+        self.resume = threading.Event()
+        self.batches = []
+        super().__init__(*args, **kwargs)
+
+    def _collect(self, first):
+        self.resume.wait(5)
+        batch = super()._collect(first)
+        self.batches.append(len(batch))
+        return batch
+
+def test_failed_operation_does_not_affect_batch(db_path):
+    queue = PausedQueue(db_path)
+    try:
+        futures = [
+            queue.submit(insert('first', 1)),
+            queue.submit(insert('a', 5)),
+            # 두 번째 문장이 실패하면 같은 작업의 첫 문장도 되돌림
+            queue.submit(insert('b', 4) + insert('a', 1)),
+            queue.submit([("INSERT INTO missing_table VALUES (?)", (1,))]),
+            queue.submit(insert('c', 3)),
+        ]
+        queue.resume.set()
+
+        assert futures[0].result(timeout=5) is None
+        assert futures[1].result(timeout=5) is None
+        with pytest.raises(sqlite3.IntegrityError):
+            futures[2].result(timeout=5)
+        with pytest.raises(sqlite3.OperationalError):
+            futures[3].result(timeout=5)
+        assert futures[4].result(timeout=5) is None
+    finally:
+        queue.close()
+
+    assert queue.batches == [5]
+    assert stored(db_path) == {'first': 1, 'a': 5, 'c': 3}
+
+def test_cancelled_operation_is_not_written(db_path):
+    queue = PausedQueue(db_path)
+    try:
+        first = queue.submit(insert('first', 1))
+        cancelled = queue.submit(insert('late', 2))
+        # 커밋을 시작하기 전에 취소한 작업은 배치에서 빠짐
+        assert cancelled.cancel()
+        queue.resume.set()
+        first.result(timeout=5)
+    finally:
+        queue.close()
+
+    assert stored(db_path) == {'first': 1}
+
+def test_connection_failure_fails_queued_operations(tmp_path):
+    queue = db_writer.WriteQueue(str(tmp_path / 'missing' / 'data.db'))
+    try:
+        futures = [queue.submit(insert(f"user{i}", i)) for i in range(3)]
+        for future in futures:
+            with pytest.raises(sqlite3.OperationalError):
+                future.result(timeout=5)
+    finally:
+        queue.close()
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+def test_after_commit_coalesces_commits_within_interval(db_path):
+    calls = []
+
+    def after_commit(conn):
+        calls.append((threading.current_thread().name, conn.execute("SELECT COUNT(*) FROM reviews").fetchone()[0]))
+
+    queue = db_writer.WriteQueue(db_path, after_commit=after_commit, after_commit_interval=60)
+    try:
+        queue.execute(insert('a', 1))
+        wait_until(lambda: len(calls) == 1)
+        queue.execute(insert('b', 2))
+        queue.execute(insert('c', 3))
+        time.sleep(0.1)
+        assert len(calls) == 1
+    finally:
+        queue.close()
+
+    # 간격 안에 들어온 커밋은 종료할 때 한 번으로 합쳐서 실행
+    assert calls == [("kus-db-after-commit", 1), ("kus-db-after-commit", 3)]
+
+def test_slow_after_commit_does_not_block_writes(db_path):
+    release = threading.Event()
+    queue = db_writer.WriteQueue(db_path, after_commit=lambda conn: release.wait(5), after_commit_interval=0)
+    try:
+        start = time.monotonic()
+        for i in range(5):
+            queue.execute(insert(f"user{i}", i), timeout=1)
+        assert time.monotonic() - start < 1
+    finally:
+        release.set()
+        queue.close()
+
+    assert len(stored(db_path)) == 5
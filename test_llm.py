@@ -0,0 +1,119 @@
+"""
+llm.stream_recommendation 테스트 (FakeStreamingModel 로 네트워크 없이 실행)
+
+실행: python -m pytest -q test_llm.py
+"""
+import threading
+import time
+
+import pytest
+
+import llm
+
+PROMPT = "오늘 메뉴 추천"
+
+class CountingModel(llm.FakeStreamingModel):
+    """보낸 조각 수를 세는 가짜 모델 (취소 후 생성이 멈췄는지 확인용)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent = 0
+
+    def _iter_chunks(self):
+        for chunk in super()._iter_chunks():
+            self.sent += 1
+            yield chunk
+
+class FailingModel(llm.FakeStreamingModel):
+    """fail_after 조각을 보낸 뒤 예외를 내는 가짜 모델"""
+
+    def __init__(self, fail_after, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail_after = fail_after
+
+    def _iter_chunks(self):
+        for i, chunk in enumerate(super()._iter_chunks()):
+            if i == self.fail_after:
+                raise RuntimeError("모델 연결 끊김")
+            yield chunk
+
+def fast_model(text="가나다라마바사아자차카타파하", model_class=llm.FakeStreamingModel, **kwargs):
+    kwargs.setdefault('chunk_size', 3)
+    kwargs.setdefault('delay', 0)
+    kwargs.setdefault('first_token_delay', 0)
+    return model_class(text=text, **kwargs)
+
+def test_streams_all_chunks_and_calls_on_complete():
+    model = fast_model()
+    completed = []
+
+    chunks = list(llm.stream_recommendation(model, PROMPT, deadline=5, on_complete=completed.append))
+
+    assert ''.join(chunks) == model.text
+    assert chunks[0] == model.text[:3]
+    assert completed == [model.text]
+    assert model.prompts == [PROMPT]
+
+def test_deadline_stops_stream_without_on_complete():
+    model = fast_model(first_token_delay=1.0)
+    completed = []
+    cancel_event = threading.Event()
+
+    start = time.monotonic()
+    chunks = list(llm.stream_recommendation(model, PROMPT, deadline=0.1, cancel_event=cancel_event,
+                                            on_complete=completed.append))
+
+    assert chunks == [llm.TIMEOUT_MESSAGE]
+    assert time.monotonic() - start < 0.5
+    assert completed == []
+    assert cancel_event.is_set()
+
+def test_deadline_keeps_chunks_received_before_timeout():
+    model = fast_model(delay=0.3)
+    chunks = list(llm.stream_recommendation(model, PROMPT, deadline=0.15))
+
+    assert chunks == [model.text[:3], llm.TIMEOUT_MESSAGE]
+
+def test_closing_generator_cancels_model():
+    model = fast_model(text="가" * 300, model_class=CountingModel, chunk_size=1, delay=0.01)
+    completed = []
+    cancel_event = threading.Event()
+
+    stream = llm.stream_recommendation(model, PROMPT, deadline=5, cancel_event=cancel_event,
+                                       on_complete=completed.append)
+    assert next(stream) == "가"
+    stream.close()
+
+    assert cancel_event.is_set()
+    time.sleep(0.1)
+    sent = model.sent
+    time.sleep(0.1)
+    assert model.sent == sent < 300
+    assert completed == []
+
+def test_model_error_is_reported_as_message():
+    model = fast_model(model_class=FailingModel, fail_after=2)
+    completed = []
+
+    chunks = list(llm.stream_recommendation(model, PROMPT, deadline=5, on_complete=completed.append))
+
+    assert chunks[:2] == [model.text[:3], model.text[3:6]]
+    assert chunks[2] == "메뉴 추천 중 오류가 발생했습니다: 모델 연결 끊김"
+    assert len(chunks) == 3
+    assert completed == []
+
+def test_model_error_before_first_chunk():
+    model = fast_model(model_class=FailingModel, fail_after=0)
+
+    chunks = list(llm.stream_recommendation(model, PROMPT, deadline=5))
+
+    assert chunks == ["메뉴 추천 중 오류가 발생했습니다: 모델 연결 끊김"]
+
+@pytest.mark.parametrize("value, enabled", [(None, False), ("0", False), ("1", True)])
+def test_fake_model_requires_explicit_opt_in(monkeypatch, value, enabled):
+    if value is None:
+        monkeypatch.delenv('KUS_FAKE_LLM', raising=False)
+    else:
+        monkeypatch.setenv('KUS_FAKE_LLM', value)
+
+    assert llm.fake_model_enabled() is enabled
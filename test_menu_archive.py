@@ -0,0 +1,70 @@
+"""
+menu_archive 테스트 (임시 디렉터리 보관소 사용)
+
+실행: python -m pytest -q test_menu_archive.py
+"""
+import os
+import threading
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+import menu_archive
+
+MONTH = '2024-03'
+DAY = '2024-03-05'
+
+def append(out_dir, dish, day=DAY):
+    return menu_archive.append_days([(day, '학생식당', '중식', [dish], 0)], [day], out_dir)[0]
+
+def dishes(out_dir, day=DAY):
+    table = menu_archive.read_month(MONTH, out_dir)
+    return [row['dish'] for row in table.to_pylist() if row['date'].isoformat() == day]
+
+@pytest.fixture
+def out_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(menu_archive, 'COMPACT_THRESHOLD', 100)
+    return str(tmp_path / 'menu_archive')
+
+def test_compact_keeps_latest_rows_per_day(out_dir):
+    append(out_dir, '김치찌개')
+    append(out_dir, '된장찌개')
+    append(out_dir, '카레라이스', day='2024-03-06')
+
+    path = menu_archive.compact(MONTH, out_dir)
+
+    assert menu_archive._list_parts(out_dir, MONTH) == [path]
+    assert dishes(out_dir) == ['된장찌개']
+    assert dishes(out_dir, '2024-03-06') == ['카레라이스']
+    assert menu_archive.compact(MONTH, out_dir) is None
+
+def test_part_written_during_compaction_stays_newer(out_dir, monkeypatch):
+    append(out_dir, '김치찌개')
+    append(out_dir, '된장찌개')
+
+    listed = threading.Event()
+    resume = threading.Event()
+    read_parts = menu_archive._read_parts
+
+    def paused_read_parts(paths):
+        # compact 가 입력 목록을 확정한 뒤 읽기 전에 멈춤
+        if threading.current_thread().name == 'compact':
+            listed.set()
+            resume.wait(5)
+        return read_parts(paths)
+
+    monkeypatch.setattr(menu_archive, '_read_parts', paused_read_parts)
+    result = []
+    compactor = threading.Thread(target=lambda: result.append(menu_archive.compact(MONTH, out_dir)), name='compact')
+    compactor.start()
+    assert listed.wait(5)
+
+    # 합치는 동안 들어온 새 메뉴
+    newest = append(out_dir, '제육볶음')
+    resume.set()
+    compactor.join(5)
+
+    assert menu_archive._list_parts(out_dir, MONTH) == [result[0], newest]
+    assert dishes(out_dir) == ['제육볶음']
+    assert os.path.exists(newest)
@@ -0,0 +1,275 @@
+"""
+menu_store 테스트 (임시 데이터베이스와 fake_diet_site 로 네트워크 없이 실행)
+
+실행: python -m pytest -q test_menu_store.py
+"""
+import sqlite3
+import threading
+import time
+from datetime import date
+
+import pytest
+
+import analytics
+import crawling
+import fake_diet_site
+import menu_diff
+import menu_store
+import snapshot
+
+MONDAY = date(2024, 3, 4)
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    # 스냅샷/보관소는 현재 디렉터리 기준 경로에 만들어지므로 임시 디렉터리에서 실행
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('KUS_CRAWL_MODE', 'live')
+    return str(tmp_path / 'data.db')
+
+@pytest.fixture
+def conn(db_path):
+    conn = menu_store.connect(db_path)
+    yield conn
+    conn.close()
+
+@pytest.fixture
+def site(monkeypatch):
+    server = fake_diet_site.make_server(latency=0.05)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(crawling, 'DIET_BASE_URL', f"http://127.0.0.1:{server.server_address[1]}")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """crawling.fetch_range 호출 기록 (주간 크롤링 횟수 확인용)"""
+    calls = []
+    fetch_range = crawling.fetch_range
+
+    def counting_fetch_range(start, end, *args, **kwargs):
+        calls.append(start)
+        return fetch_range(start, end, *args, **kwargs)
+
+    monkeypatch.setattr(crawling, 'fetch_range', counting_fetch_range)
+    return calls
+
+def expire_lease(conn, week_date):
+    with conn:
+        conn.execute("UPDATE crawl_leases SET expires_at = 0 WHERE week = ?", (week_date.isoformat(),))
+
+def test_lease_is_exclusive_until_released(conn):
+    assert menu_store.acquire_crawl_lease(conn, MONDAY) == (True, None)
+    assert menu_store.acquire_crawl_lease(conn, MONDAY) == (False, None)
+
+    menu_store.release_crawl_lease(conn, MONDAY)
+
+    assert menu_store.acquire_crawl_lease(conn, MONDAY) == (True, None)
+
+def test_failed_crawl_keeps_error_until_retry_time(conn):
+    menu_store.acquire_crawl_lease(conn, MONDAY)
+    menu_store.release_crawl_lease(conn, MONDAY, error="접속 실패")
+
+    assert menu_store.acquire_crawl_lease(conn, MONDAY) == (False, "접속 실패")
+
+    expire_lease(conn, MONDAY)
+    assert menu_store.acquire_crawl_lease(conn, MONDAY) == (True, None)
+
+def test_expired_lease_is_taken_over(conn):
+    menu_store.acquire_crawl_lease(conn, MONDAY)
+    expire_lease(conn, MONDAY)
+
+    assert menu_store.acquire_crawl_lease(conn, MONDAY) == (True, None)
+
+def test_concurrent_requests_share_one_crawl(db_path, conn, site, fetches):
+    errors = []
+
+    def request():
+        conn = menu_store.connect(db_path)
+        try:
+            errors.append(menu_store.ensure_week(conn, MONDAY))
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == [None] * 8
+    assert fetches == [MONDAY]
+    assert menu_store.is_week_fresh(conn, MONDAY)
+    assert len(menu_store.load_menus(conn, MONDAY, date(2024, 3, 10))) == 35
+
+def test_waits_for_crawl_leased_by_other_process(db_path, conn, site, fetches, monkeypatch):
+    monkeypatch.setattr(menu_store, 'CRAWL_POLL_INTERVAL', 0.01)
+    with conn:
+        conn.execute("INSERT INTO crawl_leases (week, owner, expires_at) VALUES (?, 'other', ?)",
+                     (MONDAY.isoformat(), time.time() + 60))
+
+    waiter_conn = menu_store.connect(db_path)
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(menu_store.crawl_week(waiter_conn, MONDAY)))
+    waiter.start()
+    time.sleep(0.1)
+    assert result == []
+
+    # 다른 프로세스가 크롤링을 끝내면 크롤링하지 않고 저장된 메뉴 사용
+    menu_store.mark_week_crawled(conn, MONDAY)
+    waiter.join(timeout=5)
+    waiter_conn.close()
+
+    assert result == [None]
+    assert fetches == []
+
+def test_reports_error_left_by_other_process(conn, fetches):
+    with conn:
+        conn.execute("INSERT INTO crawl_leases (week, owner, expires_at, error) VALUES (?, 'other', ?, ?)",
+                     (MONDAY.isoformat(), time.time() + 60, "접속 실패"))
+
+    assert menu_store.crawl_week(conn, MONDAY) == "접속 실패"
+    assert fetches == []
+
+def rows(*items):
+    """(날짜, 식당, 구분, 메뉴 문자열) 목록을 menu_rows 형식으로 (표시 순서는 목록 순서)"""
+    return [(*item, position) for position, item in enumerate(items)]
+
+def test_diff_menus_reports_only_changed_keys():
+    old = [('2024-03-04', '학생식당', '중식', (1, 2)), ('2024-03-04', '학생식당', '석식', (3,)),
+           ('2024-03-05', '학생식당', '중식', (4,))]
+    new = [('2024-03-04', '학생식당', '중식', (1, 2)), ('2024-03-04', '학생식당', '석식', (3, 5)),
+           ('2024-03-06', '학생식당', '중식', (6,))]
+
+    changes = menu_diff.diff_menus(old, new)
+
+    assert [(change.kind, change.date, change.category) for change in changes] == [
+        (menu_diff.CHANGED, '2024-03-04', '석식'),
+        (menu_diff.REMOVED, '2024-03-05', '중식'),
+        (menu_diff.ADDED, '2024-03-06', '중식'),
+    ]
+    assert menu_diff.changed_dates(changes) == {'2024-03-04', '2024-03-05', '2024-03-06'}
+
+def test_save_rows_writes_only_real_changes(conn):
+    first = rows(('2024-03-04', '학생식당', '중식', '쌀밥 | 김치찌개'),
+                 ('2024-03-04', '학생식당', '석식', '카레라이스'))
+    assert [change.kind for change in menu_store.save_rows(conn, MONDAY, MONDAY, first)] == [menu_diff.ADDED] * 2
+    assert menu_store.unpublished_dates(conn, MONDAY, MONDAY) == {'2024-03-04'}
+    with conn:
+        conn.execute("DELETE FROM unpublished_dates")
+
+    # 공백 차이와 표시 순서 차이는 변경이 아님 (표시 순서는 저장만 갱신)
+    same = rows(('2024-03-04', '학생식당', '석식', '카레라이스'),
+                ('2024-03-04', '학생식당', '중식', '쌀밥 |  김치찌개 '))
+    assert menu_store.save_rows(conn, MONDAY, MONDAY, same) == []
+    assert menu_store.unpublished_dates(conn, MONDAY, MONDAY) == set()
+    assert [menu['category'] for menu in menu_store.load_menus(conn, MONDAY, MONDAY)] == ['석식', '중식']
+
+    changed = rows(('2024-03-04', '학생식당', '중식', '쌀밥 | 된장찌개'))
+    changes = menu_store.save_rows(conn, MONDAY, MONDAY, changed)
+
+    assert [(change.kind, change.category) for change in changes] == [
+        (menu_diff.REMOVED, '석식'), (menu_diff.CHANGED, '중식')]
+    assert [menu['menu'] for menu in menu_store.load_menus(conn, MONDAY, MONDAY)] == [['쌀밥', '된장찌개']]
+    assert menu_store.unpublished_dates(conn, MONDAY, MONDAY) == {'2024-03-04'}
+
+def test_failed_day_keeps_stored_menu(conn, site):
+    assert menu_store.ensure_week(conn, MONDAY) is None
+    stored = menu_store.load_menus(conn, date(2024, 3, 6), date(2024, 3, 6))
+    assert stored
+
+    site.RequestHandlerClass.fail_dates = frozenset([date(2024, 3, 6)])
+    with conn:
+        conn.execute("DELETE FROM crawled_weeks")
+        conn.execute("DELETE FROM menus WHERE date = '2024-03-05'")
+
+    error = menu_store.ensure_week(conn, MONDAY)
+
+    # 가져온 날은 저장하고, 가져오지 못한 날은 저장된 메뉴를 그대로 두며 주는 다시 크롤링할 대상으로 남음
+    assert error.startswith("2024-03-06 ")
+    assert menu_store.load_menus(conn, date(2024, 3, 6), date(2024, 3, 6)) == stored
+    assert menu_store.load_menus(conn, date(2024, 3, 5), date(2024, 3, 5))
+    assert not menu_store.is_week_fresh(conn, MONDAY)
+
+def test_failed_publish_is_retried(conn, site, monkeypatch):
+    export_week = snapshot.export_week
+
+    def failing_export_week(*args, **kwargs):
+        raise OSError("디스크 가득 참")
+
+    monkeypatch.setattr(snapshot, 'export_week', failing_export_week)
+    with pytest.raises(OSError):
+        menu_store.ensure_week(conn, MONDAY)
+
+    assert len(menu_store.unpublished_dates(conn, MONDAY, date(2024, 3, 10))) == 5
+    assert not menu_store.is_week_fresh(conn, MONDAY)
+
+    notified = []
+    monkeypatch.setattr(snapshot, 'export_week', export_week)
+    expire_lease(conn, MONDAY)  # CRAWL_RETRY_AFTER 경과
+    menu_diff.subscribe(notified.append)
+    try:
+        assert menu_store.ensure_week(conn, MONDAY) is None
+    finally:
+        menu_diff.unsubscribe(notified.append)
+
+    # 다시 크롤링한 메뉴는 그대로지만 반영하지 못했던 날짜를 반영하고 날짜 단위로 알림
+    assert menu_store.unpublished_dates(conn, MONDAY, date(2024, 3, 10)) == set()
+    assert menu_store.is_week_fresh(conn, MONDAY)
+    assert len(notified) == 1
+    assert menu_diff.changed_dates(notified[0]) == {f"2024-03-0{day}" for day in range(4, 9)}
+    assert set(snapshot.read_manifest()['day']) >= {f"2024-03-0{day}" for day in range(4, 9)}
+
+def create_text_menus(db_path, menus):
+    """이전 버전 형식 (menu 열에 ' | ' 로 이은 요리 이름) 의 메뉴 테이블"""
+    conn = sqlite3.connect(db_path)
+    conn.execute('''CREATE TABLE menus
+                    (date TEXT, restaurant TEXT, category TEXT, menu TEXT, position INTEGER,
+                     PRIMARY KEY (date, restaurant, category))''')
+    conn.execute("CREATE TABLE reviews (date TEXT, username TEXT, rating INTEGER, review_text TEXT, recommended BOOLEAN)")
+    conn.executemany("INSERT INTO menus VALUES (?, ?, ?, ?, ?)", rows(*menus))
+    conn.commit()
+    return conn
+
+def test_migrates_text_menus_to_dish_ids(db_path):
+    create_text_menus(db_path, [('2024-03-04', '학생식당', '중식', '쌀밥 | 김치  찌개'),
+                                ('2024-03-05', '학생식당', '중식', '쌀밥')]).close()
+
+    conn = menu_store.connect(db_path)
+    try:
+        assert [row[1] for row in conn.execute("PRAGMA table_info(menus)")] == [
+            'date', 'restaurant', 'category', 'dish_ids', 'position']
+        menus = menu_store.load_menus(conn, MONDAY, date(2024, 3, 5))
+        assert [menu['menu'] for menu in menus] == [['쌀밥', '김치 찌개'], ['쌀밥']]
+        assert menus[0]['dish_ids'][0] == menus[1]['dish_ids'][0]
+    finally:
+        conn.close()
+
+    # 이미 변환된 저장소는 그대로
+    conn = menu_store.connect(db_path)
+    try:
+        assert menu_store.load_menus(conn, MONDAY, date(2024, 3, 5)) == menus
+    finally:
+        conn.close()
+
+def test_migration_keeps_analytics_triggers(db_path):
+    old = create_text_menus(db_path, [('2024-03-04', '학생식당', '중식', '쌀밥 | 김치찌개')])
+    analytics.init_analytics_tables(old)
+    with old:
+        old.execute("DELETE FROM analytics_dirty")
+    old.close()
+
+    # analytics 를 초기화하지 않는 프로세스 (api.py 등) 가 변환한 경우
+    conn = menu_store.connect(db_path)
+    try:
+        triggers = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'menus'")}
+        assert triggers == {'menus_dirty_insert', 'menus_dirty_update', 'menus_dirty_delete'}
+        assert conn.execute("SELECT date FROM analytics_dirty").fetchall() == [('2024-03-04',)]
+
+        analytics.refresh(conn)
+        menu_store.save_rows(conn, date(2024, 3, 5), date(2024, 3, 5),
+                             rows(('2024-03-05', '학생식당', '중식', '카레라이스')))
+        assert conn.execute("SELECT date FROM analytics_dirty").fetchall() == [('2024-03-05',)]
+    finally:
+        conn.close()